@@ -0,0 +1,67 @@
+#######################################################################
+# Compare writing a stream of records with namedlist.codec against
+#  pickling them, one pickle per chunk of records. Reports the size of
+#  the stream and the time to write and read it.
+#
+# Usage: python bench/bench_codec.py [count]
+########################################################################
+
+from __future__ import print_function
+
+import io
+import os
+import sys
+import pickle
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchutil import best_time
+from namedlist import namedlist, codec
+
+Tick = namedlist('Tick', 'ts px qty sym', types='q d i str')
+
+PROTOCOL = pickle.HIGHEST_PROTOCOL
+CHUNK = 4096
+
+
+def pickle_dump(records):
+    f = io.BytesIO()
+    for idx in range(0, len(records), CHUNK):
+        pickle.dump(records[idx:idx + CHUNK], f, PROTOCOL)
+    return f.getvalue()
+
+
+def pickle_load(data):
+    f = io.BytesIO(data)
+    records = []
+    while f.tell() < len(data):
+        records.extend(pickle.load(f))
+    return records
+
+
+def codec_dump(records):
+    f = io.BytesIO()
+    codec(Tick).dump(records, f)
+    return f.getvalue()
+
+
+def codec_load(data):
+    return list(codec(Tick).load(io.BytesIO(data)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    records = [Tick(idx, idx * 0.25, idx % 100, 'SYM{0}'.format(idx % 500))
+               for idx in range(count)]
+    print('{0} records'.format(count))
+    print('{0:<10} {1:>12} {2:>10} {3:>10}'.format('', 'bytes', 'dump', 'load'))
+    for label, dump, load in (('pickle', pickle_dump, pickle_load),
+                              ('codec', codec_dump, codec_load)):
+        dump_time, data = best_time(lambda: dump(records))
+        load_time, loaded = best_time(lambda: load(data))
+        assert loaded == records
+        print('{0:<10} {1:>12} {2:>9.3f}s {3:>9.3f}s'.format(label, len(data), dump_time,
+                                                             load_time))
+
+
+if __name__ == '__main__':
+    main()
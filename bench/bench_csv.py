@@ -0,0 +1,68 @@
+#######################################################################
+# Compare reading and writing records as CSV with _csv_reader and
+#  _csv_writer, against the usual hand-written code: converting each
+#  value of each row and calling the class, and writing a list of each
+#  record's attributes.
+#
+# Usage: python bench/bench_csv.py [count]
+########################################################################
+
+from __future__ import print_function
+
+import io
+import os
+import sys
+import csv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchutil import best_time
+from namedlist import namedlist
+
+Tick = namedlist('Tick', 'ts px qty sym', types='q d i str')
+
+
+def by_hand_write(records):
+    f = io.StringIO(newline='')
+    writer = csv.writer(f)
+    writer.writerow(Tick._fields)
+    for record in records:
+        writer.writerow([record.ts, record.px, record.qty, record.sym])
+    return f.getvalue()
+
+
+def by_hand_read(data):
+    reader = csv.reader(io.StringIO(data, newline=''))
+    next(reader)
+    return [Tick(int(row[0]), float(row[1]), int(row[2]), row[3]) for row in reader]
+
+
+def csv_write(records):
+    f = io.StringIO(newline='')
+    Tick._csv_writer(f).writerows(records)
+    return f.getvalue()
+
+
+def csv_read(data):
+    return list(Tick._csv_reader(io.StringIO(data, newline='')))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    records = [Tick(idx, idx * 0.25, idx % 100, 'SYM{0}'.format(idx % 500))
+               for idx in range(count)]
+    print('{0} records, rows per second'.format(count))
+    print('{0:<12} {1:>12} {2:>12}'.format('', 'write', 'read'))
+    for label, write, read in (('by hand', by_hand_write, by_hand_read),
+                               ('namedlist', csv_write, csv_read)):
+        write_time, data = best_time(lambda: write(records))
+        read_time, loaded = best_time(lambda: read(data))
+        assert loaded == records
+        # Don't let the records read by one method slow down garbage
+        #  collection in the next.
+        del data, loaded
+        print('{0:<12} {1:>12.0f} {2:>12.0f}'.format(label, count / write_time,
+                                                     count / read_time))
+
+
+if __name__ == '__main__':
+    main()
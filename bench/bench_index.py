@@ -0,0 +1,74 @@
+#######################################################################
+# Time positional access to namedlist fields: reading and writing one
+#  field by index, and reading a slice, for classes with 3 and 16
+#  fields. Given the path of another checkout, time both, alternating
+#  between them so that they see the same machine load.
+#
+# Usage: python bench/bench_index.py [OTHER_CHECKOUT]
+########################################################################
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+SETUP = '''
+from __main__ import load
+P = load({root!r}).namedlist('P', ['f{{0}}'.format(idx) for idx in range({nfields})])
+p = P(*range({nfields}))
+'''
+
+STATEMENTS = ('p[1]', 'p[-1]', 'p[1] = 0', 'p[:2]')
+
+NUMBER = 20000
+REPEAT = 50
+
+_modules = {}
+
+
+# Import namedlist.py from the checkout at root, under its own name.
+def load(root):
+    if root not in _modules:
+        path = os.path.join(root, 'namedlist.py')
+        name = 'namedlist_{0}'.format(len(_modules))
+        if sys.version_info[0] == 2:
+            import imp
+            module = imp.load_source(name, path)
+        else:
+            import importlib.util
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        _modules[root] = module
+    return _modules[root]
+
+
+# The best time per statement for each of roots, in the order of
+#  STATEMENTS.
+def bench(roots, nfields):
+    timers = [[timeit.Timer(stmt, SETUP.format(root=root, nfields=nfields)) for stmt in STATEMENTS]
+              for root in roots]
+    best = [[float('inf')] * len(STATEMENTS) for root in roots]
+    for _ in range(REPEAT):
+        for root_best, root_timers in zip(best, timers):
+            for idx, timer in enumerate(root_timers):
+                root_best[idx] = min(root_best[idx], timer.timeit(NUMBER) / NUMBER)
+    return best
+
+
+def main():
+    roots = [os.path.abspath(ROOT)] + [os.path.abspath(root) for root in sys.argv[1:]]
+    print('{0:>40} {1:>7} {2:>10} {3:>10} {4:>10} {5:>10}'.format('checkout', 'fields', 'p[1]',
+                                                                 'p[-1]', 'p[1] = 0', 'p[:2]'))
+    for nfields in (3, 16):
+        for root, times in zip(roots, bench(roots, nfields)):
+            print('{0:>40} {1:>7} {2:>10.1f} {3:>10.1f} {4:>10.1f} {5:>10.1f}'.format(
+                root[-40:], nfields, *[t * 1e9 for t in times]))
+    print('(times in ns)')
+
+
+if __name__ == '__main__':
+    main()
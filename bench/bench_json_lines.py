@@ -0,0 +1,64 @@
+#######################################################################
+# Compare writing and reading records as JSON Lines with _to_json_lines
+#  and _from_json_lines, in object and array mode, against calling
+#  json.dumps(record._asdict()) and json.loads() for each line.
+#
+# Usage: python bench/bench_json_lines.py [count]
+########################################################################
+
+from __future__ import print_function
+
+import io
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchutil import best_time
+from namedlist import namedlist
+
+Tick = namedlist('Tick', 'ts px qty sym', types='q d i str')
+
+
+def per_line_dump(records):
+    f = io.StringIO()
+    for record in records:
+        f.write(json.dumps(record._asdict()) + '\n')
+    return f.getvalue()
+
+
+def per_line_load(data):
+    return [Tick(**json.loads(line)) for line in io.StringIO(data)]
+
+
+def dumper(mode):
+    def dump(records):
+        f = io.StringIO()
+        Tick._to_json_lines(records, f, mode)
+        return f.getvalue()
+    return dump
+
+
+def loader(mode):
+    def load(data):
+        return list(Tick._from_json_lines(io.StringIO(data), mode))
+    return load
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    records = [Tick(idx, idx * 0.25, idx % 100, 'SYM{0}'.format(idx % 500))
+               for idx in range(count)]
+    print('{0} records, lines per second'.format(count))
+    print('{0:<12} {1:>12} {2:>12}'.format('', 'dump', 'load'))
+    for label, dump, load in (('per line', per_line_dump, per_line_load),
+                              ('object mode', dumper('object'), loader('object')),
+                              ('array mode', dumper('array'), loader('array'))):
+        dump_time, data = best_time(lambda: dump(records))
+        load_time, loaded = best_time(lambda: load(data))
+        assert loaded == records
+        print('{0:<12} {1:>12.0f} {2:>12.0f}'.format(label, count / dump_time, count / load_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+#######################################################################
+# Compare instance creation of namedlist.namedtuple against
+#  collections.namedtuple, for types with 2, 8 and 32 fields.
+#
+# Usage: python bench/bench_namedtuple_new.py
+########################################################################
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+import collections
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import namedlist
+
+NUMBER = 200000
+REPEAT = 5
+
+
+def bench(factory, nfields):
+    fields = ['f{0}'.format(idx) for idx in range(nfields)]
+    cls = factory('T', fields)
+    args = tuple(range(nfields))
+    return min(timeit.repeat(lambda: cls(*args), number=NUMBER, repeat=REPEAT)) / NUMBER
+
+
+def main():
+    print('{0:>7} {1:>12} {2:>15} {3:>7}'.format('fields', 'stdlib (ns)', 'namedlist (ns)', 'ratio'))
+    for nfields in (2, 8, 32):
+        stdlib = bench(collections.namedtuple, nfields)
+        ours = bench(namedlist.namedtuple, nfields)
+        print('{0:>7} {1:>12.1f} {2:>15.1f} {3:>7.2f}'.format(nfields, stdlib * 1e9,
+                                                              ours * 1e9, ours / stdlib))
+
+
+if __name__ == '__main__':
+    main()
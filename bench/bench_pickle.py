@@ -0,0 +1,52 @@
+#######################################################################
+# Compare pickling a list of namedlist instances with the generated
+#  __reduce__, against the default protocol, which creates each
+#  instance with copyreg.__newobj__ and calls __getstate__ and
+#  __setstate__, and against pickling them in a RecordBatch. Reports
+#  the pickle size and the dumps and loads times.
+#
+# Usage: python bench/bench_pickle.py [count]
+########################################################################
+
+from __future__ import print_function
+
+import os
+import sys
+import pickle
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchutil import best_time
+from namedlist import namedlist, RecordBatch
+
+Tick = namedlist('Tick', 'ts px qty sym')
+
+# The same class, pickled the way namedlist instances used to be.
+DefaultTick = namedlist('DefaultTick', 'ts px qty sym')
+DefaultTick.__reduce__ = object.__reduce__
+
+PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def measure(cls, count, batch):
+    records = [cls(idx, idx * 0.25, idx % 100, 'SYM') for idx in range(count)]
+    if batch:
+        records = RecordBatch(cls, records)
+    dumps_time, data = best_time(lambda: pickle.dumps(records, PROTOCOL))
+    loads_time, loaded = best_time(lambda: pickle.loads(data))
+    assert loaded == records
+    return len(data), dumps_time, loads_time
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print('{0} records, protocol {1}'.format(count, PROTOCOL))
+    print('{0:<20} {1:>12} {2:>10} {3:>10}'.format('', 'bytes', 'dumps', 'loads'))
+    for label, cls, batch in (('default protocol', DefaultTick, False),
+                              ('__reduce__', Tick, False),
+                              ('RecordBatch', Tick, True)):
+        size, dumps_time, loads_time = measure(cls, count, batch)
+        print('{0:<20} {1:>12} {2:>9.3f}s {3:>9.3f}s'.format(label, size, dumps_time, loads_time))
+
+
+if __name__ == '__main__':
+    main()
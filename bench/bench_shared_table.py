@@ -0,0 +1,83 @@
+#######################################################################
+# Compare sending 1M records to a multiprocessing pool by pickling them,
+#  with sending slices of a SharedRecordTable, which only pickles the
+#  name of the shared memory and a range of records.
+#
+# Usage: python bench/bench_shared_table.py [count]
+########################################################################
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import pickle
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from namedlist import namedlist, SharedRecordTable
+
+Tick = namedlist('Tick', 'ts px qty', types='q d i', storage='struct')
+SlotTick = namedlist('SlotTick', 'ts px qty')
+
+WORKERS = 4
+
+
+def total_qty(records):
+    return sum(record.qty for record in records)
+
+
+def total_qty_table(table):
+    with table:
+        return total_qty(table)
+
+
+def chunks(count):
+    size = -(-count // WORKERS)
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+def timed(label, fn):
+    start = time.time()
+    result = fn()
+    print('{0:<40} {1:8.3f}s'.format(label, time.time() - start))
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rows = [(idx, idx * 0.5, idx % 100) for idx in range(count)]
+    records = SlotTick._make_many(rows)
+    print('{0} records, {1} workers'.format(count, WORKERS))
+
+    data = timed('pickle.dumps of records', lambda: pickle.dumps(records, -1))
+    timed('pickle.loads of records', lambda: pickle.loads(data))
+    print('{0:<40} {1:8d} bytes'.format('pickled size', len(data)))
+
+    table = timed('SharedRecordTable.from_records', lambda: SharedRecordTable.from_records(Tick, rows))
+    try:
+        print('{0:<40} {1:8d} bytes'.format('pickled size of table',
+                                            len(pickle.dumps(table, -1))))
+
+        pool = multiprocessing.Pool(WORKERS)
+        try:
+            pool.map(total_qty, [[]] * WORKERS)     # start the workers
+            expected = sum(row[2] for row in rows)
+            result = timed('pool, pickled records',
+                           lambda: sum(pool.map(total_qty, [records[start:stop]
+                                                            for start, stop in chunks(count)])))
+            assert result == expected
+            result = timed('pool, SharedRecordTable slices',
+                           lambda: sum(pool.map(total_qty_table, [table[start:stop]
+                                                                  for start, stop in chunks(count)])))
+            assert result == expected
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        table.close()
+        table.unlink()
+
+
+if __name__ == '__main__':
+    main()
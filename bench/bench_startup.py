@@ -0,0 +1,73 @@
+#######################################################################
+# Measure the time from starting a process to creating the first
+#  instance, for a process that creates a schema's worth of classes
+#  with namedlist and namedtuple. Compare running without the code
+#  cache, with an empty code cache, and with a populated one.
+#
+# Usage: python bench/bench_startup.py [types]
+########################################################################
+
+from __future__ import print_function
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+RUNS = 7
+
+# Run in a child process: create the classes, then the first instance,
+#  and print the time taken since just before importing namedlist.
+CHILD = '''
+import sys
+import time
+start = time.time()
+sys.path.insert(0, {root!r})
+import namedlist
+specs = []
+for idx in range({types}):
+    fields = ['f{{0}}'.format(i) for i in range(2 + idx % 30)]
+    factory = namedlist.namedlist if idx % 2 else namedlist.namedtuple
+    specs.append((factory, 'T{{0}}'.format(idx), fields, {{'default': 0}}))
+classes = namedlist.make_types(specs)
+classes[0]()
+print(time.time() - start)
+'''
+
+
+def run(types, cache_dir):
+    env = dict(os.environ)
+    env.pop('NAMEDLIST_CODE_CACHE', None)
+    if cache_dir is not None:
+        env['NAMEDLIST_CODE_CACHE'] = cache_dir
+    output = subprocess.check_output([sys.executable, '-c', CHILD.format(root=ROOT, types=types)],
+                                     env=env)
+    return float(output)
+
+
+def main():
+    types = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    cache_dir = tempfile.mkdtemp()
+    try:
+        no_cache = min(run(types, None) for _ in range(RUNS))
+
+        cold = []
+        for _ in range(RUNS):
+            shutil.rmtree(cache_dir)
+            cold.append(run(types, cache_dir))
+
+        warm = min(run(types, cache_dir) for _ in range(RUNS))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print('{0} types, time to first instance:'.format(types))
+    print('  no code cache:    {0:.1f} ms'.format(no_cache * 1000))
+    print('  empty code cache: {0:.1f} ms'.format(min(cold) * 1000))
+    print('  warm code cache:  {0:.1f} ms'.format(warm * 1000))
+
+
+if __name__ == '__main__':
+    main()
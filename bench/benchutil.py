@@ -0,0 +1,19 @@
+#######################################################################
+# Helpers shared by the benchmarks in this directory.
+########################################################################
+
+import time
+
+REPEAT = 3
+
+
+# Call fn REPEAT times. Returns the best time, in seconds, and the
+#  result of the last call.
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        start = time.time()
+        result = fn()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
@@ -24,32 +24,64 @@
 #
 ########################################################################
 
-__all__ = ['namedlist', 'namedtuple', 'NO_DEFAULT', 'FACTORY']
+__all__ = ['namedlist', 'namedtuple', 'namedlist_array', 'NO_DEFAULT', 'FACTORY',
+           'RecordBatch', 'SharedRecordTable', 'codec', 'make_types', 'set_code_cache',
+           'type_cache']
 
 # All of this hassle with ast is solely to provide a decent __init__
 #  function, that takes all of the right arguments and defaults. But
 #  it's worth it to get all of the normal python error messages.
+# Since we're generating __init__ (and namedtuple's __new__) anyway,
+#  its body is specialized for the class: each argument is stored
+#  directly into its field.
 # For other functions, like __repr__, we don't bother. __init__ is
 #  the only function where we really need the argument processing,
 #  because __init__ is the only function whose signature will vary
 #  per class.
 
-import ast as _ast
 import sys as _sys
-import copy as _copy
 import operator as _operator
-import itertools as _itertools
 from keyword import iskeyword as _iskeyword
 import collections as _collections
-import abc as _abc
 try:
     import collections.abc as _collections_abc
 except ImportError:
     import collections as _collections_abc
+try:
+    import _thread
+except ImportError:
+    import thread as _thread
+
+# A module that's imported the first time one of its attributes is
+#  used, which keeps importing namedlist fast: ast, for example, is only
+#  needed to create a class. The first use replaces the global that
+#  refers to the _LazyModule with the module itself.
+class _LazyModule(object):
+    def __init__(self, name, global_name):
+        self._name = name
+        self._global_name = global_name
+
+    def __getattr__(self, attr):
+        __import__(self._name)
+        module = _sys.modules[self._name]
+        globals()[self._global_name] = module
+        return getattr(module, attr)
+
+_ast = _LazyModule('ast', '_ast')
+_array = _LazyModule('array', '_array')
+_struct = _LazyModule('struct', '_struct')
+_copy = _LazyModule('copy', '_copy')
+_itertools = _LazyModule('itertools', '_itertools')
+
+_FunctionType = type(lambda: None)
+_CodeType = type((lambda: None).__code__)
 
 _PY2 = _sys.version_info[0] == 2
 _PY3 = _sys.version_info[0] == 3
 _PY38_or_higher = _PY3 and _sys.version_info.minor >= 8
+_PY39_or_higher = _PY3 and _sys.version_info.minor >= 9
+
+_builtins = _sys.modules['__builtin__' if _PY2 else 'builtins']
 
 try:
     _OrderedDict = _collections.OrderedDict
@@ -60,9 +92,12 @@ except AttributeError:
 if _PY2:
     _basestring = basestring
     _iteritems = lambda d, **kw: iter(d.iteritems(**kw))
+    from itertools import imap as _map, ifilter as _filter
 else:
     _basestring = str
     _iteritems = lambda d, **kw: iter(d.items(**kw))
+    _map = map
+    _filter = filter
 
 
 NO_DEFAULT = object()
@@ -157,58 +192,357 @@ class _NameChecker(object):
 
 
 ########################################################################
-# Returns a function with name 'name', that calls another function 'chain_fn'
-# This is used to create the __init__ function with the right argument names and defaults, that
-#  calls into _init to do the real work.
-# The new function takes args as arguments, with defaults as given.
-def _make_fn(name, chain_fn, args, defaults):
-    args_with_self = ['_self'] + list(args)
-    arguments = [_ast.Name(id=arg, ctx=_ast.Load()) for arg in args_with_self]
-    defs = [_ast.Name(id='_def{0}'.format(idx), ctx=_ast.Load()) for idx, _ in enumerate(defaults)]
+# Helpers for building the ast of the generated functions.
+
+def _load(name):
+    return _ast.Name(id=name, ctx=_ast.Load())
+
+def _store(name):
+    return _ast.Name(id=name, ctx=_ast.Store())
+
+def _attribute(name, attr, ctx):
+    return _ast.Attribute(value=_load(name), attr=attr, ctx=ctx)
+
+def _call(func, args):
+    return _ast.Call(func=func, args=args, keywords=[])
+
+def _constant(value):
+    if _PY38_or_higher:
+        return _ast.Constant(value=value)
+    if isinstance(value, _basestring):
+        return _ast.Str(s=value)
+    return _ast.Num(n=value)
+
+# The slice of a subscript, which is wrapped in an Index before Python 3.9.
+def _index(value):
+    if _PY39_or_higher:
+        return value
+    return _ast.Index(value=value)
+
+def _raise(exc):
+    if _PY2:
+        return _ast.Raise(type=exc, inst=None, tback=None)
+    return _ast.Raise(exc=exc, cause=None)
+
+# try:
+#     <body>
+# except <exc_name>:
+#     <handler>
+def _try_except(body, exc_name, handler):
+    handlers = [_ast.ExceptHandler(type=_load(exc_name), name=None, body=handler)]
+    if _PY2:
+        return _ast.TryExcept(body=body, handlers=handlers, orelse=[])
+    return _ast.Try(body=body, handlers=handlers, orelse=[], finalbody=[])
+
+# The value to store for the argument 'name'. If the field has a FACTORY
+#  default, call the factory instead of storing the FACTORY itself.
+def _field_value(name, has_factory):
+    if not has_factory:
+        return _load(name)
+    return _ast.IfExp(test=_call(_load('_isinstance'), [_load(name), _load('_FACTORY')]),
+                      body=_call(_attribute(name, '_callable', _ast.Load()), []),
+                      orelse=_load(name))
+
+# For each field, does it have a FACTORY default? The defaults apply to
+#  the last len(defaults) fields.
+def _factory_flags(fields, defaults, markers=(0, 0), kwdefaults=None):
+    return [isinstance(default, FACTORY)
+            for default in _field_defaults(fields, defaults, markers, kwdefaults)]
+
+# The default of each field, or NO_DEFAULT if it doesn't have one.
+#  defaults are the defaults of the trailing positional fields, and
+#  kwdefaults maps keyword-only fields to their defaults.
+def _field_defaults(fields, defaults, markers=(0, 0), kwdefaults=None):
+    positional = len(fields) - markers[1]
+    kwdefaults = kwdefaults or {}
+    return ([NO_DEFAULT] * (positional - len(defaults)) + list(defaults) +
+            [kwdefaults.get(field, NO_DEFAULT) for field in fields[positional:]])
+
+# Insert the '/' and '*' markers into the argument names, given the
+#  number of positional-only and keyword-only fields.
+def _with_markers(fields, markers):
+    posonly, kwonly = markers
+    args = list(fields)
+    if kwonly:
+        args.insert(len(args) - kwonly, '*')
+    if posonly:
+        args.insert(posonly, '/')
+    return args
+
+# Globals needed by the code produced by _field_value.
+_FACTORY_GLOBALS = {'_isinstance': isinstance, '_FACTORY': FACTORY}
+
+
+########################################################################
+# Build the ast of the function 'name' produced by builder(fields,
+#  *shape).
+# builder returns the argument names and the list of ast statements
+#  making up the body of the function. As in a def statement, the
+#  argument names may include '/' after the positional-only arguments
+#  and '*' before the keyword-only arguments.
+def _function_def(name, builder, fields, shape):
+    args, body = builder(fields, *shape)
+
+    posonlyargs = []
+    kwonlyargs = []
+    if '/' in args:
+        idx = args.index('/')
+        posonlyargs, args = args[:idx], args[idx + 1:]
+    if '*' in args:
+        idx = args.index('*')
+        args, kwonlyargs = args[:idx], args[idx + 1:]
+
+    # The defaults are not part of the code object, they're supplied
+    #  when the function is created in _make_fn.
     if _PY2:
-        parameters = _ast.arguments(args=[_ast.Name(id=arg, ctx=_ast.Param()) for arg in args_with_self],
-                                    defaults=defs)
+        parameters = _ast.arguments(args=[_ast.Name(id=arg, ctx=_ast.Param()) for arg in args],
+                                    defaults=[])
     else:
         if _PY38_or_higher:
-            parameters = _ast.arguments(args=[_ast.arg(arg=arg) for arg in args_with_self],
-                                        posonlyargs=[],
-                                        kwonlyargs=[],
-                                        defaults=defs,
-                                        kw_defaults=[])
+            parameters = _ast.arguments(args=[_ast.arg(arg=arg) for arg in args],
+                                        posonlyargs=[_ast.arg(arg=arg) for arg in posonlyargs],
+                                        kwonlyargs=[_ast.arg(arg=arg) for arg in kwonlyargs],
+                                        defaults=[],
+                                        kw_defaults=[None] * len(kwonlyargs))
         else:
-            parameters = _ast.arguments(args=[_ast.arg(arg=arg) for arg in args_with_self],
-                                        kwonlyargs=[],
-                                        defaults=defs,
-                                        kw_defaults=[])
+            parameters = _ast.arguments(args=[_ast.arg(arg=arg) for arg in args],
+                                        kwonlyargs=[_ast.arg(arg=arg) for arg in kwonlyargs],
+                                        defaults=[],
+                                        kw_defaults=[None] * len(kwonlyargs))
+
+    if not body:
+        body = [_ast.Pass()]
+
+    return _ast.FunctionDef(name=name, args=parameters, body=body, decorator_list=[])
+
+# Compile the functions given by fns, a list of (name, builder, fields,
+#  shape), in a single module, and return a list of their code objects.
+def _compile_fns(fns):
+    if len(fns) == 1:
+        names = [fns[0][0]]
+    else:
+        # Give each function a unique name, so the code objects can't be
+        #  merged as constants of the module, and rename them afterwards.
+        names = ['_fn{0}'.format(idx) for idx in range(len(fns))]
+    defs = [_function_def(name, builder, fields, shape)
+            for name, (_, builder, fields, shape) in zip(names, fns)]
 
     if _PY38_or_higher:
-        module_node = _ast.Module(body=[_ast.FunctionDef(name=name,
-                                                         args=parameters,
-                                                         body=[_ast.Return(value=_ast.Call(func=_ast.Name(id='_chain', ctx=_ast.Load()),
-                                                                                           args=arguments,
-                                                                                           keywords=[]))],
-                                                         decorator_list=[])],
-                                  type_ignores=[])
+        module_node = _ast.Module(body=defs, type_ignores=[])
+    else:
+        module_node = _ast.Module(body=defs)
+
+    _fix_locations(module_node)
+
+    # compile the ast, and extract the functions' code from the module
+    module_code = compile(module_node, '<string>', 'exec')
+    codes = [const for const in module_code.co_consts if isinstance(const, _CodeType)]
+    if len(fns) == 1:
+        return codes
+    return [_renamed_code(code, name) for code, (name, _, _, _) in zip(codes, fns)]
+
+# Put every node on line 1. This does the job of ast.fix_missing_locations,
+#  faster, since none of the nodes have a location yet.
+def _fix_locations(node):
+    todo = [node]
+    while todo:
+        node = todo.pop()
+        if 'lineno' in node._attributes:
+            node.lineno = node.end_lineno = 1
+            node.col_offset = node.end_col_offset = 0
+        for name in node._fields:
+            value = getattr(node, name, None)
+            if isinstance(value, list):
+                todo.extend(item for item in value if isinstance(item, _ast.AST))
+            elif isinstance(value, _ast.AST):
+                todo.append(value)
+
+def _renamed_code(code, name):
+    if hasattr(code, 'co_qualname'):
+        return code.replace(co_name=name, co_qualname=name)
+    return code.replace(co_name=name)
+
+# Compile the function 'name' produced by builder(fields, *shape), and
+#  return its code object.
+def _compile_fn(name, builder, fields, shape):
+    return _compile_fns([(name, builder, fields, shape)])[0]
+
+
+# Compiled code objects, keyed on the shape of the generated function:
+#  its name, builder, the number of fields, and whatever else the
+#  builder needs. The fields are given placeholder names, which are
+#  replaced with the real field names for each class.
+_templates = {}
+
+# Python 2 and Python < 3.8 can't rename the variables in a code
+#  object, so they compile every function, or load it from the code
+#  cache.
+_can_replace_code = hasattr(_CodeType, 'replace')
+
+def _placeholders(count):
+    while len(_placeholder_names) < count:
+        _placeholder_names.append('_f{0}'.format(len(_placeholder_names)))
+    return _placeholder_names[:count]
+
+_placeholder_names = []
+
+# Replace the placeholder names in a template's code with the field
+#  names. Field names are used both as arguments and as attributes.
+def _code_for_fields(code, fields):
+    if not fields:
+        return code
+    names = dict(zip(_placeholders(len(fields)), fields))
+    return code.replace(co_varnames=tuple(map(names.get, code.co_varnames, code.co_varnames)),
+                        co_names=tuple(map(names.get, code.co_names, code.co_names)))
+
+# While make_types is creating classes, _batch.pending maps the key of
+#  each template that hasn't been compiled yet to a list of (function,
+#  fields) that need it. The functions are created with _pending_code,
+#  and get their real code once all of the templates are compiled.
+#  _batch.cached holds the type_cache entries of the classes until then.
+_batch = _thread._local()
+_pending_code = (lambda: None).__code__
+
+# Returns a function with name 'name', whose code is produced by
+#  builder(fields, *shape).
+# This is used to create the __init__ function with the right argument
+#  names and defaults, and with a body specialized for the class.
+# The new function has the given defaults, and uses globals_ as its
+#  globals.
+def _make_fn(name, builder, fields, defaults, globals_, *shape):
+    # eval() would add __builtins__ to the globals, but _FunctionType
+    #  doesn't. Before Python 3.10, calling a function whose globals lack
+    #  it creates a new builtins dict for every call.
+    globals_.setdefault('__builtins__', _builtins)
+    if _can_replace_code:
+        key = (name, builder, len(fields), shape)
+        code = _templates.get(key)
+        if code is None:
+            pending = getattr(_batch, 'pending', None)
+            if pending is not None:
+                fn = _FunctionType(_pending_code, globals_, name, tuple(defaults) or None)
+                pending.setdefault(key, []).append((fn, fields))
+                return fn
+            code = _templates.setdefault(key, _template_codes([key])[0])
+        code = _code_for_fields(code, fields)
     else:
-        module_node = _ast.Module(body=[_ast.FunctionDef(name=name,
-                                                         args=parameters,
-                                                         body=[_ast.Return(value=_ast.Call(func=_ast.Name(id='_chain', ctx=_ast.Load()),
-                                                                                           args=arguments,
-                                                                                           keywords=[]))],
-                                                         decorator_list=[])])
+        # Without templates, the code cache keeps each function's code
+        #  under its field names.
+        key = (name, builder, tuple(fields), shape)
+        code = _load_cached_code(key)
+        if code is None:
+            code = _compile_fn(name, builder, fields, shape)
+            _store_cached_code(key, code)
+
+    return _FunctionType(code, globals_, name, tuple(defaults) or None)
+
+# Compile the templates needed by the functions in pending, all in one
+#  module, and give each function its code.
+def _compile_pending(pending):
+    keys = list(pending)
+    codes = _template_codes(keys)
+    for key, code in zip(keys, codes):
+        code = _templates.setdefault(key, code)
+        for fn, fields in pending[key]:
+            fn.__code__ = _code_for_fields(code, fields)
+
+# Returns the code of the templates with the given keys. They're loaded
+#  from the code cache if it's enabled, otherwise they're compiled, all
+#  in one module.
+def _template_codes(keys):
+    codes = [_load_cached_code(key) for key in keys]
+    missing = [idx for idx, code in enumerate(codes) if code is None]
+    if missing:
+        compiled = _compile_fns([(name, builder, _placeholders(count), shape)
+                                 for name, builder, count, shape in (keys[idx] for idx in missing)])
+        for idx, code in zip(missing, compiled):
+            codes[idx] = code
+            _store_cached_code(keys[idx], code)
+    return codes
 
-    module_node = _ast.fix_missing_locations(module_node)
 
-    # compile the ast
-    code = compile(module_node, '<string>', 'exec')
+########################################################################
+# The code cache. Like __pycache__, it keeps the marshalled code of the
+#  templates in a directory, so that later runs don't have to compile
+#  them. Each template is stored in its own file, named after a hash of
+#  the template's key, the Python implementation, and the size and
+#  modification time of this module.
+# It's disabled by default. Enable it with set_code_cache(path), or by
+#  setting the NAMEDLIST_CODE_CACHE environment variable to a directory.
+
+_code_cache_dir = None
+_code_cache_tag = None
+
+def set_code_cache(path):
+    """Store the compiled code of generated functions in the directory
+    path, and load it from there instead of compiling it again. None
+    disables the cache."""
+    global _code_cache_dir, _code_cache_tag
+    if path is not None:
+        import os
+        path = os.path.abspath(path)
+        if _code_cache_tag is None:
+            try:
+                st = os.stat(__file__)
+            except (NameError, OSError):
+                raise ValueError('the code cache requires namedlist to be loaded from a file')
+            _code_cache_tag = '{0} {1} {2}'.format(_sys.version, st.st_size, st.st_mtime)
+    _code_cache_dir = path
+
+def _cached_code_path(key):
+    import os
+    import hashlib
+    # fields is the number of fields for a template, or the field names
+    #  when functions are compiled for each class.
+    name, builder, fields, shape = key
+    digest = hashlib.sha1(repr((_code_cache_tag, name, builder.__name__, fields, shape))
+                          .encode('utf-8')).hexdigest()
+    return os.path.join(_code_cache_dir, digest + '.marshal')
+
+def _load_cached_code(key):
+    if _code_cache_dir is None:
+        return None
+    import marshal
+    try:
+        with open(_cached_code_path(key), 'rb') as fp:
+            code = marshal.load(fp)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(code, _CodeType):
+        return None
+    return code
+
+def _store_cached_code(key, code):
+    if _code_cache_dir is None:
+        return
+    import os
+    import marshal
+    path = _cached_code_path(key)
+    # Write to a temporary file and rename it, so that other processes
+    #  never see a partly written file.
+    tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+    try:
+        if not os.path.isdir(_code_cache_dir):
+            os.makedirs(_code_cache_dir)
+        with open(tmp_path, 'wb') as fp:
+            marshal.dump(code, fp)
+        getattr(os, 'replace', os.rename)(tmp_path, path)
+    except (IOError, OSError):
+        try:
+            os.remove(tmp_path)
+        except (IOError, OSError):
+            pass
 
-    # and eval it in the right context
-    globals_ = {'_chain': chain_fn}
-    locals_ = dict(('_def{0}'.format(idx), value) for idx, value in enumerate(defaults))
-    eval(code, globals_, locals_)
 
-    # extract our function from the newly created module
-    return locals_[name]
+# Returns the __init__ function 'name' produced by builder(fields,
+#  factory_flags, markers, *shape), with the defaults of the
+#  positional fields and the keyword-only fields.
+def _make_init_fn(name, builder, fields, defaults, markers, kwdefaults, globals_, *shape):
+    fn = _make_fn(name, builder, fields, defaults, globals_,
+                  tuple(_factory_flags(fields, defaults, markers, kwdefaults)), markers, *shape)
+    if kwdefaults:
+        fn.__kwdefaults__ = dict(kwdefaults)
+    return fn
 
 
 ########################################################################
@@ -219,30 +553,50 @@ def _field_name_with_default(name, default):
         return name
     return '{0}={1!r}'.format(name, default)
 
-def _build_docstring(typename, fields, defaults):
+def _build_docstring(typename, fields, defaults, markers=(0, 0), kwdefaults=None):
     # We can use NO_DEFAULT as a sentinel here, becuase it will never be
     #  present in defaults. By this point, it has been removed and replaced
     #  with actual default values.
 
-    # The defaults make this a little tricky. Append a sentinel in
-    #  front of defaults until it's the same length as fields. The
-    #  sentinel value is used in _name_with_default
-    defaults = [NO_DEFAULT] * (len(fields) - len(defaults)) + defaults
-    return '{0}({1})'.format(typename, ', '.join(_field_name_with_default(name, default)
-                                                 for name, default in zip(fields, defaults)))
+    # The defaults make this a little tricky. _field_defaults gives the
+    #  sentinel for each field without a default, and the '/' and '*'
+    #  markers don't have defaults at all. The sentinel value is used
+    #  in _name_with_default
+    defaults = dict(zip(fields, _field_defaults(fields, defaults, markers, kwdefaults)))
+    return '{0}({1})'.format(typename, ', '.join(_field_name_with_default(name, defaults.get(name, NO_DEFAULT))
+                                                 for name in _with_markers(fields, markers)))
 
 
 ########################################################################
 # Given the typename, fields_names, default, and the rename flag,
-#  return a tuple of fields and a list of defaults.
+#  return a tuple of fields and a list of defaults. The field names
+#  can't include the '/' and '*' markers.
 def _fields_and_defaults(typename, field_names, default, rename):
+    fields, defaults, markers, kwdefaults = _parse_fields(typename, field_names, default, rename)
+    if markers != (0, 0):
+        raise ValueError("'/' and '*' are only supported by namedlist")
+    return fields, defaults
+
+# Given the typename, fields_names, default, and the rename flag,
+#  return a tuple of fields, a list of the defaults of the positional
+#  fields, the markers, and a dict of the defaults of the keyword-only
+#  fields. markers is a 2-tuple of the number of positional-only and
+#  keyword-only fields.
+def _parse_fields(typename, field_names, default, rename):
     # field_names must be a string or an iterable, consisting of fieldname
     #  strings or 2-tuples. Each 2-tuple is of the form (fieldname,
-    #  default).
+    #  default). As in a def statement, the fields before a '/' are
+    #  positional-only, and the fields after a '*' are keyword-only.
 
     # Keeps track of the fields we're adding, with their defaults.
     fields = _Fields(default)
 
+    # The number of positional-only fields, and the keyword-only fields
+    #  with their defaults. Keyword-only fields without a default can
+    #  follow those with one, so they're not kept in fields.
+    posonly = 0
+    kwonly = None
+
     # Validates field and type names.
     name_checker = _NameChecker(typename)
 
@@ -252,8 +606,11 @@ def _fields_and_defaults(typename, field_names, default, rename):
         field_names = field_names.replace(',', ' ').split()
 
     # If field_names is a Mapping, change it to return the
-    #  (field_name, default) pairs, as if it were a list.
-    if isinstance(field_names, _collections_abc.Mapping):
+    #  (field_name, default) pairs, as if it were a list. Lists are
+    #  checked first, because registering the classes with the
+    #  Sequence ABC resets the cached isinstance checks.
+    if (not isinstance(field_names, list) and
+            isinstance(field_names, _collections_abc.Mapping)):
         field_names = field_names.items()
 
     # Parse and validate the field names.
@@ -261,7 +618,25 @@ def _fields_and_defaults(typename, field_names, default, rename):
     # field_names is now an iterable. Walk through it,
     # sanitizing as needed, and add to fields.
 
-    for idx, field_name in enumerate(field_names):
+    idx = 0
+    for field_name in field_names:
+        if field_name == '/':
+            if not _PY38_or_higher:
+                raise ValueError("'/' requires Python 3.8 or higher")
+            if posonly or kwonly is not None:
+                raise ValueError("'/' must come before '*', and only once")
+            posonly = idx
+            if not posonly:
+                raise ValueError("at least one field must come before '/'")
+            continue
+        if field_name == '*':
+            if not _PY3:
+                raise ValueError("'*' requires Python 3")
+            if kwonly is not None:
+                raise ValueError("'*' may only be given once")
+            kwonly = []
+            continue
+
         if isinstance(field_name, _basestring):
             default = fields.default_not_specified
         else:
@@ -279,17 +654,97 @@ def _fields_and_defaults(typename, field_names, default, rename):
         # Okay: now we have the field_name and the default value (if any).
         # Validate the name, and add the field.
         # Convert field_name to str for python 2.x
-        fields.add(name_checker.check_field_name(str(field_name), rename, idx), default)
+        field_name = name_checker.check_field_name(str(field_name), rename, idx)
+        idx += 1
+        if kwonly is None:
+            fields.add(field_name, default)
+        else:
+            kwonly.append((field_name, default))
+
+    if kwonly == []:
+        raise ValueError("at least one field must follow '*'")
+
+    # A keyword-only field uses the default value, unless it has its
+    #  own.
+    kwdefaults = {}
+    for field_name, default in kwonly or ():
+        if default is fields.default_not_specified or default is NO_DEFAULT:
+            default = fields.default
+        if default is not NO_DEFAULT:
+            kwdefaults[field_name] = default
 
     return (tuple(fields.without_defaults + [name for name, default in
-                                             fields.with_defaults]),
-            [default for _, default in fields.with_defaults])
+                                             fields.with_defaults] +
+                  [name for name, default in kwonly or ()]),
+            [default for _, default in fields.with_defaults],
+            (posonly, len(kwonly or ())),
+            kwdefaults)
+
+########################################################################
+# Given the fields and the types argument, return a tuple with the
+#  type of each field.
+# types may be a string of type codes separated by spaces or commas, an
+#  iterable with one type code per field, or a mapping from field name
+#  to type code. A type code is a struct format character, such as 'd'
+#  or 'q', optionally with a count for strings, such as '10s', or one of
+#  _VARIABLE_TYPES, for text or bytes of any length. Fields without a
+#  type code have a type of None.
+_VARIABLE_TYPES = ('str', 'bytes')
+
+def _parse_types(fields, types):
+    if types is None:
+        return (None,) * len(fields)
+
+    if isinstance(types, _basestring):
+        types = types.replace(',', ' ').split()
+
+    if isinstance(types, _collections_abc.Mapping):
+        unknown = set(types) - set(fields)
+        if unknown:
+            raise ValueError('types given for unknown fields: '
+                             '{0!r}'.format(sorted(unknown)))
+        types = [types.get(field) for field in fields]
+    else:
+        types = list(types)
+        if len(types) != len(fields):
+            raise ValueError('expected {0} types, got {1}: '
+                             '{2!r}'.format(len(fields), len(types), types))
+
+    for field, code in zip(fields, types):
+        if code is not None and code not in _VARIABLE_TYPES and _struct_items(code) != 1:
+            raise ValueError('invalid type code for field {0}: '
+                             '{1!r}'.format(field, code))
+    return tuple(types)
+
+# The number of values a struct format code describes, or None if it's
+#  not a valid code.
+def _struct_items(code):
+    if not isinstance(code, _basestring):
+        return None
+    try:
+        s = _struct.Struct('<' + code)
+    except _struct.error:
+        return None
+    return len(s.unpack(bytes(bytearray(s.size))))
+
+# The kind of value a field with a type code holds, for converting it to
+#  and from text: 'int', 'float' or 'str', or None for anything else.
+_VALUE_KINDS = dict.fromkeys('bBhHiIlLqQnN', 'int')
+_VALUE_KINDS.update(dict.fromkeys('efd', 'float'))
+
+def _value_kind(code):
+    if code == 'str':
+        return 'str'
+    if code is None or code in _VARIABLE_TYPES:
+        return None
+    return _VALUE_KINDS.get(code[-1])
+
 
 ########################################################################
 # Common member functions for the generated classes.
 
 def _repr(self):
-    return '{0}({1})'.format(self.__class__.__name__, ', '.join('{0}={1!r}'.format(name, getattr(self, name)) for name in self._fields))
+    return '{0}({1})'.format(self.__class__.__name__, ', '.join('{0}={1!r}'.format(name, value) for name, value in zip(self._fields, self)))
 
 def _asdict(self):
     # In 2.6, return a dict.
@@ -298,64 +753,334 @@ def _asdict(self):
     return t(zip(self._fields, self))
 
 # Set up methods and fields shared by namedlist and namedtuple
-def _common_fields(fields, docstr):
+def _common_fields(fields, docstr, module):
     type_dict = {'__repr__': _repr,
                  '__dict__': property(_asdict),
                  '__doc__': docstr,
                  '_asdict': _asdict,
                  '_fields': fields}
+    if module is not None:
+        type_dict['__module__'] = module
+    return type_dict
 
-    # See collections.namedtuple for a description of
-    #  what's happening here.
-    # _getframe(2) instead of 1, because we're now inside
-    #  another function.
+# Returns the name of the module that called the factory function, or
+#  None if it can't be determined. See collections.namedtuple for a
+#  description of what's happening here. depth is the number of frames
+#  between the factory function and the caller of this function.
+def _caller_module(depth):
     try:
-        type_dict['__module__'] = _sys._getframe(2).f_globals.get('__name__', '__main__')
+        return _sys._getframe(depth + 1).f_globals.get('__name__', '__main__')
     except (AttributeError, ValueError):
-        pass
-    return type_dict
+        return None
 
 
 ########################################################################
 # namedlist methods
 
-# The function that __init__ calls to do the actual work.
-def _nl_init(self, *args):
-    # sets all of the fields to their passed in values
-    for fieldname, value in _get_values(self._fields, args):
-        setattr(self, fieldname, value)
-
-def _nl_eq(self, other):
-    return isinstance(other, self.__class__) and all(getattr(self, name) == getattr(other, name) for name in self._fields)
+# Store value into the field at idx of _self:
+#  _self.x = value
+# Or, if the class is frozen, call the slot's setter, which is filled
+#  into the globals once the class exists:
+#  _set0(_self, value)
+def _store_field(fields, idx, value, frozen):
+    if frozen:
+        return _ast.Expr(value=_call(_load('_set{0}'.format(idx)), [_load('_self'), value]))
+    return _ast.Assign(targets=[_attribute('_self', fields[idx], _ast.Store())], value=value)
+
+# Build the __init__ function. Its body stores each argument directly
+#  into its field, calling the FACTORY only for those fields that have
+#  a FACTORY default.
+def _nl_init_builder(fields, factory_flags, markers, frozen):
+    body = [_store_field(fields, idx, _field_value(field, has_factory), frozen)
+            for idx, (field, has_factory) in enumerate(zip(fields, factory_flags))]
+    return ['_self'] + _with_markers(fields, markers), body
+
+def _nl_make_init(fields, defaults, globals_, frozen=False, markers=(0, 0), kwdefaults=None):
+    globals_.update(_FACTORY_GLOBALS)
+    return _make_init_fn('__init__', _nl_init_builder, fields, defaults, markers, kwdefaults,
+                         globals_, frozen)
+
+# Build _make and _make_many. Instead of binding arguments, they create
+#  the instance with object.__new__ and unpack each row directly into
+#  its fields, which also checks the length of the row.
+# If packed is true, the class uses struct storage: the row is unpacked
+#  into local variables, which are packed into the instance's buffer.
+# If frozen is true, the row is unpacked into local variables, which are
+#  stored with the slots' setters.
+def _new_instance_from_row(fields, packed, frozen):
+    new_instance = _ast.Assign(targets=[_store('_self')],
+                               value=_call(_load('_object_new'), [_load('_cls')]))
+    if frozen:
+        # _self = _object_new(_cls)
+        # x, y = _row
+        # _set0(_self, x)
+        # _set1(_self, y)
+        targets = _ast.Tuple(elts=[_store(field) for field in fields], ctx=_ast.Store())
+        return [new_instance, _ast.Assign(targets=[targets], value=_load('_row'))] + [
+            _store_field(fields, idx, _load(field), True) for idx, field in enumerate(fields)]
+    if not packed:
+        # _self = _object_new(_cls)
+        # _self.x, _self.y = _row
+        targets = _ast.Tuple(elts=[_attribute('_self', field, _ast.Store()) for field in fields],
+                             ctx=_ast.Store())
+        return [new_instance, _ast.Assign(targets=[targets], value=_load('_row'))]
+
+    # _self = _object_new(_cls)
+    # x, y = _row
+    # _self._buf = _bytearray(_pack(x, y))
+    # _self._offset = 0
+    targets = _ast.Tuple(elts=[_store(field) for field in fields], ctx=_ast.Store())
+    return [new_instance,
+            _ast.Assign(targets=[targets], value=_load('_row'))] + _assign_buffer(
+                [_load(field) for field in fields])
+
+def _nl_make_builder(fields, packed, frozen):
+    # _self = <new instance from _row>
+    # return _self
+    body = _new_instance_from_row(fields, packed, frozen) + [_ast.Return(value=_load('_self'))]
+    return ['_cls', '_row'], body
+
+def _nl_make_many_builder(fields, packed, frozen):
+    # _result = []
+    # _append = _result.append
+    # for _row in _rows:
+    #     _self = <new instance from _row>
+    #     _append(_self)
+    # return _result
+    loop_body = _new_instance_from_row(fields, packed, frozen) + [
+        _ast.Expr(value=_call(_load('_append'), [_load('_self')]))]
+    body = [_ast.Assign(targets=[_store('_result')],
+                        value=_ast.List(elts=[], ctx=_ast.Load())),
+            _ast.Assign(targets=[_store('_append')],
+                        value=_attribute('_result', 'append', _ast.Load())),
+            _ast.For(target=_store('_row'),
+                     iter=_load('_rows'),
+                     body=loop_body,
+                     orelse=[]),
+            _ast.Return(value=_load('_result'))]
+    return ['_cls', '_rows'], body
+
+# globals_ is shared with the class's other generated functions, so
+#  that the setters of a frozen class can be filled in later.
+def _nl_make_constructors(fields, globals_, packed=False, frozen=False):
+    globals_['_object_new'] = object.__new__
+    return (classmethod(_make_fn('_make', _nl_make_builder, fields, [], globals_,
+                                 packed, frozen)),
+            classmethod(_make_fn('_make_many', _nl_make_many_builder, fields, [], globals_,
+                                 packed, frozen)))
+
+# (_self.x, _self.y), or the same for _other
+def _fields_tuple(name, fields):
+    return _ast.Tuple(elts=[_attribute(name, field, _ast.Load()) for field in fields],
+                      ctx=_ast.Load())
+
+# _isinstance(_other, _self.__class__)
+def _same_class():
+    return _call(_load('_isinstance'), [_load('_other'),
+                                        _attribute('_self', '__class__', _ast.Load())])
+
+# Build __eq__, which compares the fields as tuples:
+#  return _other is _self or (_isinstance(_other, _self.__class__) and
+#                             (_self.x, _self.y) == (_other.x, _other.y))
+def _nl_eq_builder(fields):
+    same_class = _same_class()
+    equal = _ast.Compare(left=_fields_tuple('_self', fields), ops=[_ast.Eq()],
+                         comparators=[_fields_tuple('_other', fields)])
+    identical = _ast.Compare(left=_load('_other'), ops=[_ast.Is()], comparators=[_load('_self')])
+    result = _ast.BoolOp(op=_ast.Or(),
+                         values=[identical, _ast.BoolOp(op=_ast.And(), values=[same_class, equal])])
+    return ['_self', '_other'], [_ast.Return(value=result)]
+
+def _nl_make_eq(fields):
+    return _make_fn('__eq__', _nl_eq_builder, fields, [], {'_isinstance': isinstance})
+
+# Build __lt__, __le__, __gt__ or __ge__, which compare the fields as
+#  tuples. op is the name of the ast comparison operator:
+#  if _isinstance(_other, _self.__class__):
+#      return (_self.x, _self.y) < (_other.x, _other.y)
+#  return _NotImplemented
+def _nl_order_builder(fields, op):
+    compare = _ast.Compare(left=_fields_tuple('_self', fields), ops=[getattr(_ast, op)()],
+                           comparators=[_fields_tuple('_other', fields)])
+    body = [_ast.If(test=_same_class(), body=[_ast.Return(value=compare)], orelse=[]),
+            _ast.Return(value=_load('_NotImplemented'))]
+    return ['_self', '_other'], body
+
+_ORDER_OPS = (('__lt__', 'Lt'), ('__le__', 'LtE'), ('__gt__', 'Gt'), ('__ge__', 'GtE'))
+
+def _nl_make_order(fields):
+    globals_ = {'_isinstance': isinstance, '_NotImplemented': NotImplemented}
+    return dict((name, _make_fn(name, _nl_order_builder, fields, [], globals_, op))
+                for name, op in _ORDER_OPS)
+
+# Build __hash__, which hashes the fields as a tuple, to agree with
+#  __eq__:
+#  return _hash_of((_self.x, _self.y))
+# If cached is true, the hash is stored in the _hash slot the first
+#  time it's computed:
+#  try:
+#      return _self._hash
+#  except _AttributeError:
+#      _h = _hash_of((_self.x, _self.y))
+#      _set_hash(_self, _h)
+#      return _h
+def _nl_hash_builder(fields, cached):
+    value = _call(_load('_hash_of'), [_fields_tuple('_self', fields)])
+    if not cached:
+        return ['_self'], [_ast.Return(value=value)]
+    compute = [_ast.Assign(targets=[_store('_h')], value=value),
+               _ast.Expr(value=_call(_load('_set_hash'), [_load('_self'), _load('_h')])),
+               _ast.Return(value=_load('_h'))]
+    body = [_try_except([_ast.Return(value=_attribute('_self', '_hash', _ast.Load()))],
+                        '_AttributeError', compute)]
+    return ['_self'], body
+
+# Build __getstate__, which returns the fields as a tuple:
+#  return (_self.x, _self.y)
+def _nl_getstate_builder(fields):
+    return ['_self'], [_ast.Return(value=_fields_tuple('_self', fields))]
+
+# Build __iter__, which iterates over the same tuple:
+#  return _iter((_self.x, _self.y))
+def _nl_iter_builder(fields):
+    return ['_self'], [_ast.Return(value=_call(_load('_iter'), [_fields_tuple('_self', fields)]))]
+
+# Build __reduce__, which pickles an instance as a call to its class
+#  with the tuple of its fields, if the class's __init__ is the generated
+#  one, _init:
+#  if _self.__class__.__init__ == _init:
+#      return (_self.__class__, (_self.x, _self.y))
+#  return (_make_instance, (_self.__class__, (_self.x, _self.y)))
+# Only the class and one tuple per instance go into the pickle, and
+#  unpickling doesn't call __setstate__. Otherwise, and always if the
+#  class has keyword-only fields, which can't be passed positionally,
+#  the instance is created with _make by _nl_make_instance, so
+#  subclasses that override __init__ can still be copied and unpickled.
+# _init is compared with ==, since on Python 2 each access to
+#  __init__ creates a new unbound method.
+def _nl_reduce_builder(fields, kwonly):
+    cls = _attribute('_self', '__class__', _ast.Load())
+    values = _fields_tuple('_self', fields)
+    result = _ast.Tuple(elts=[_load('_make_instance'),
+                              _ast.Tuple(elts=[cls, values], ctx=_ast.Load())],
+                        ctx=_ast.Load())
+    body = [_ast.Return(value=result)]
+    if not kwonly:
+        generated_init = _ast.Compare(left=_ast.Attribute(value=cls, attr='__init__',
+                                                          ctx=_ast.Load()),
+                                      ops=[_ast.Eq()], comparators=[_load('_init')])
+        body.insert(0, _ast.If(test=generated_init,
+                               body=[_ast.Return(value=_ast.Tuple(elts=[cls, values],
+                                                                  ctx=_ast.Load()))],
+                               orelse=[]))
+    return ['_self'], body
+
+def _nl_make_instance(cls, values):
+    return cls._make(values)
 
 def _nl_ne(self, other):
-    return not _nl_eq(self, other)
+    return not self.__eq__(other)
 
 def _nl_len(self):
     return len(self._fields)
 
-def _nl_getstate(self):
-    return tuple(getattr(self, fieldname) for fieldname in self._fields)
-
 def _nl_setstate(self, state):
     for fieldname, value in zip(self._fields, state):
         setattr(self, fieldname, value)
 
-def _nl_getitem(self, idx):
-    if isinstance(idx, slice):
-        # this isn't super-efficient, but works
-        return [getattr(self, self._fields[i]) for i in range(*idx.indices(len(self._fields)))]
-
-    return getattr(self, self._fields[idx])
-
-def _nl_setitem(self, idx, value):
-    return setattr(self, self._fields[idx], value)
+# Build __getitem__. The class's _fields, and _getters for slices, are
+#  in the function's globals, so an integer index is one tuple lookup
+#  and a getattr():
+#  if _idx.__class__ is _slice:
+#      return _get_fields(_self, _getters[_idx])
+#  try:
+#      _name = _fields[_idx]
+#  except _IndexError:
+#      raise _IndexError('list index out of range')
+#  return _getattr(_self, _name)
+def _nl_getitem_builder(fields):
+    is_slice = _ast.Compare(left=_attribute('_idx', '__class__', _ast.Load()), ops=[_ast.Is()],
+                            comparators=[_load('_slice')])
+    getters = _ast.Subscript(value=_load('_getters'), slice=_index(_load('_idx')),
+                             ctx=_ast.Load())
+    name = _ast.Subscript(value=_load('_fields'), slice=_index(_load('_idx')), ctx=_ast.Load())
+    message = _constant('list index out of range')
+    body = [_ast.If(test=is_slice,
+                    body=[_ast.Return(value=_call(_load('_get_fields'),
+                                                  [_load('_self'), getters]))],
+                    orelse=[]),
+            _try_except([_ast.Assign(targets=[_store('_name')], value=name)],
+                        '_IndexError', [_raise(_call(_load('_IndexError'), [message]))]),
+            _ast.Return(value=_call(_load('_getattr'), [_load('_self'), _load('_name')]))]
+    return ['_self', '_idx'], body
+
+# Build __setitem__, with the class's _fields in its globals. Slices and
+#  indexes out of range make setattr() or the lookup fail, and are
+#  handled by _nl_setitem_error, so that integer indexes take no extra
+#  steps:
+#  try:
+#      _setattr(_self, _fields[_idx], _value)
+#  except _errors:
+#      _setitem_error(_self, _idx, _value)
+def _nl_setitem_builder(fields):
+    name = _ast.Subscript(value=_load('_fields'), slice=_index(_load('_idx')), ctx=_ast.Load())
+    assign = _call(_load('_setattr'), [_load('_self'), name, _load('_value')])
+    handler = _call(_load('_setitem_error'), [_load('_self'), _load('_idx'), _load('_value')])
+    body = [_try_except([_ast.Expr(value=assign)], '_errors', [_ast.Expr(value=handler)])]
+    return ['_self', '_idx', '_value'], body
+
+# __getitem__ and __setitem__ for the class with the given _getters and
+#  fields.
+def _nl_make_item_fns(getters, fields):
+    return (_make_fn('__getitem__', _nl_getitem_builder, fields, [],
+                     {'_fields': fields, '_getattr': getattr, '_getters': getters,
+                      '_slice': slice, '_IndexError': IndexError, '_get_fields': _nl_get_fields}),
+            _make_fn('__setitem__', _nl_setitem_builder, fields, [],
+                     {'_fields': fields, '_setattr': setattr, '_errors': (TypeError, IndexError),
+                      '_setitem_error': _nl_setitem_error}))
+
+def _nl_get_fields(self, getters):
+    return [getter(self) for getter in getters]
+
+# Called by __setitem__ while it handles a TypeError or IndexError. A
+#  slice is assigned, and an index out of range gets the list message.
+#  Any other error, such as one raised by a field's setter, is re-raised.
+def _nl_setitem_error(self, idx, value):
+    if idx.__class__ is slice:
+        _nl_set_fields(self, self._fields[idx], value)
+        return
+    try:
+        self._fields[idx]
+    except IndexError:
+        raise IndexError('list assignment index out of range')
+    raise
+
+# A slice assignment. The number of fields can't change, so the number
+#  of values must match.
+def _nl_set_fields(self, fieldnames, values):
+    values = tuple(values)
+    if len(values) != len(fieldnames):
+        raise ValueError('attempt to assign sequence of size {0} to slice of '
+                         'size {1}'.format(len(values), len(fieldnames)))
+    for fieldname, value in zip(fieldnames, values):
+        setattr(self, fieldname, value)
 
-def _nl_iter(self):
-    return (getattr(self, fieldname) for fieldname in self._fields)
+def _nl_set_many(self, start, iterable):
+    """Set consecutive fields, starting with the field at index start, to
+    the values from iterable."""
+    values = tuple(iterable)
+    count = len(self._fields)
+    if start < 0:
+        start += count
+    if not 0 <= start <= count:
+        raise IndexError('list assignment index out of range')
+    if start + len(values) > count:
+        raise ValueError('{0} values given for the {1} fields starting at '
+                         'index {2}'.format(len(values), count - start, start))
+    _nl_set_fields(self, self._fields[start:start + len(values)], values)
 
 def _nl_count(self, value):
-    return sum(1 for v in iter(self) if v == value)
+    return sum(1 for v in self if v == value)
 
 def _nl_index(self, value, start=NO_DEFAULT, stop=NO_DEFAULT):
     # not the most efficient way to implement this, but it will work
@@ -394,34 +1119,591 @@ def _nl_replace(_self, **kwds):
         setattr(other, key, value)
     return other
 
+########################################################################
+# namedlist methods for frozen classes.
+# The fields of a frozen instance are only set when it's created. The
+#  generated functions that create instances call the slots' setters
+#  directly, bypassing __setattr__.
+
+def _nlf_setattr(self, name, value):
+    raise AttributeError('cannot assign to {0!r}: {1} instances are '
+                         'frozen'.format(name, self.__class__.__name__))
+
+def _nlf_delattr(self, name):
+    raise AttributeError('cannot delete {0!r}: {1} instances are '
+                         'frozen'.format(name, self.__class__.__name__))
+
+def _nlf_setitem(self, idx, value):
+    raise TypeError('{0!r} object does not support item '
+                    'assignment'.format(self.__class__.__name__))
+
+def _nlf_setstate(self, state):
+    for fieldname, value in zip(self._fields, state):
+        object.__setattr__(self, fieldname, value)
+
+def _nlf_replace(_self, **kwds):
+    result = _self._make([kwds.pop(name, value) for name, value in zip(_self._fields, _self)])
+    if kwds:
+        raise ValueError('Got unexpected field names: %r' % list(kwds))
+    return result
+
+# Add the frozen members to type_dict. globals_ are the globals of the
+#  class's generated functions.
+def _nlf_update_type_dict(type_dict, fields, globals_, cache_hash):
+    globals_.update(_hash_of=hash, _AttributeError=AttributeError)
+    type_dict.update({'__setattr__': _nlf_setattr,
+                      '__delattr__': _nlf_delattr,
+                      '__setitem__': _nlf_setitem,
+                      '__setstate__': _nlf_setstate,
+                      '__hash__': _make_fn('__hash__', _nl_hash_builder, fields, [], globals_,
+                                           cache_hash),
+                      '_replace': _nlf_replace,
+                      '__slots__': fields + (('_hash',) if cache_hash else ())})
+
+# Fill the setters of the frozen class t's slots into globals_.
+def _nlf_bind_setters(t, fields, globals_, cache_hash):
+    for idx, field in enumerate(fields):
+        globals_['_set{0}'.format(idx)] = t.__dict__[field].__set__
+    if cache_hash:
+        globals_['_set_hash'] = t.__dict__['_hash'].__set__
+
+########################################################################
+# namedlist methods for struct storage.
+# With storage='struct', an instance has no slot per field. Instead, the
+#  fields are packed with the struct module into a buffer, the _buf
+#  member, starting at _offset. Each field is a property which packs and
+#  unpacks its value in place. Values are little-endian, with standard
+#  sizes and no padding, so the buffer can be written directly to files
+#  and sockets.
+# Normally _buf is a bytearray owned by the instance, and _offset is 0.
+#  But _at() creates an instance which is a view into any other buffer,
+#  such as a memoryview or an mmap, without copying it.
+
+# _self._buf = _bytearray(_pack(values...))
+# _self._offset = 0
+def _assign_buffer(values):
+    return [_ast.Assign(targets=[_attribute('_self', '_buf', _ast.Store())],
+                        value=_call(_load('_bytearray'), [_call(_load('_pack'), values)])),
+            _ast.Assign(targets=[_attribute('_self', '_offset', _ast.Store())],
+                        value=_constant(0))]
+
+# Build __init__, which packs all of its arguments at once.
+def _nls_init_builder(fields, factory_flags, markers):
+    body = _assign_buffer([_field_value(field, has_factory)
+                           for field, has_factory in zip(fields, factory_flags)])
+    return ['_self'] + _with_markers(fields, markers), body
+
+def _nls_iter(self):
+    return iter(self._struct.unpack_from(self._buf, self._offset))
+
+def _nls_eq(self, other):
+    # Compare the unpacked values, not the bytes: 0.0 == -0.0, for example.
+    return other is self or (isinstance(other, self.__class__) and
+                             self._struct.unpack_from(self._buf, self._offset) ==
+                             other._struct.unpack_from(other._buf, other._offset))
+
+def _nls_getstate(self):
+    # Only this record's bytes, even if this is a view into a larger buffer.
+    return bytes(self._buf[self._offset:self._offset + self._struct.size])
+
+def _nls_setstate(self, state):
+    self._buf = bytearray(state)
+    self._offset = 0
+
+def _nls_frombytes(cls, data):
+    if len(data) != cls._struct.size:
+        raise ValueError('expected {0} bytes, got {1}'.format(cls._struct.size, len(data)))
+    self = object.__new__(cls)
+    self._buf = bytearray(data)
+    self._offset = 0
+    return self
+
+def _nls_at(cls, buf, index=0, offset=0):
+    # Return a view of record number index in buf, where the records
+    #  start at offset. Reading and writing the view's fields reads and
+    #  writes buf.
+    size = cls._struct.size
+    if index < 0:
+        index += (len(buf) - offset) // size
+    start = offset + index * size
+    if index < 0 or offset < 0 or start + size > len(buf):
+        raise IndexError('record index out of range')
+    self = object.__new__(cls)
+    self._buf = buf
+    self._offset = start
+    return self
+
+def _nls_property(idx, code, offset):
+    field_struct = _struct.Struct('<' + code)
+    unpack_from = field_struct.unpack_from
+    pack = field_struct.pack
+    size = field_struct.size
+    def get(self):
+        return unpack_from(self._buf, self._offset + offset)[0]
+    def set(self, value):
+        # Not pack_into, which clears the field before checking value.
+        start = self._offset + offset
+        self._buf[start:start + size] = pack(value)
+    return property(get, set, doc='Alias for field number {0}'.format(idx))
+
+########################################################################
+# Files of records, for classes with struct storage.
+# A record file starts with a fixed size prefix: a magic number, the
+#  number of records, and the size of the header. The header is JSON,
+#  describing the fields and their types. It's padded so the records,
+#  which follow it, start at a multiple of 8 bytes.
+
+_RECORDS_MAGIC = b'NLRECS\x00\x01'
+_RECORDS_PREFIX = '<8sQI'
+
+# Return the prefix and header for count records of cls.
+def _records_header(cls, count):
+    import json
+    header = json.dumps({'typename': cls.__name__,
+                         'fields': list(cls._fields),
+                         'types': list(cls._types)}).encode('utf-8')
+    prefix_size = _struct.calcsize(_RECORDS_PREFIX)
+    padding = -(prefix_size + len(header)) % 8
+    return (_struct.pack(_RECORDS_PREFIX, _RECORDS_MAGIC, count, len(header) + padding) +
+            header + b' ' * padding)
+
+# Check that buf starts with a header for records of cls. Return the
+#  number of records, and the offset of the first record.
+def _read_records_header(cls, buf):
+    import json
+    prefix_size = _struct.calcsize(_RECORDS_PREFIX)
+    if len(buf) < prefix_size:
+        raise ValueError('not a record file: too short')
+    magic, count, header_size = _struct.unpack_from(_RECORDS_PREFIX, buf)
+    if magic != _RECORDS_MAGIC:
+        raise ValueError('not a record file: bad magic number {0!r}'.format(magic))
+    header = json.loads(bytes(buf[prefix_size:prefix_size + header_size]).decode('utf-8'))
+    if tuple(header['fields']) != cls._fields or tuple(header['types']) != cls._types:
+        raise ValueError('records have fields {0!r} and types {1!r}, expected {2!r} and '
+                         '{3!r}'.format(header['fields'], header['types'],
+                                        list(cls._fields), list(cls._types)))
+    offset = prefix_size + header_size
+    if len(buf) < offset + count * cls._struct.size:
+        raise ValueError('record file is truncated')
+    return count, offset
+
+# Packed bytes for each record. Records that are instances of cls are
+#  already packed, anything else is packed from its values.
+def _packed_records(cls, records):
+    pack = cls._struct.pack
+    for record in records:
+        if isinstance(record, cls):
+            yield record.__getstate__()
+        else:
+            yield pack(*record)
+
+def _nls_dump_file(cls, path, records):
+    # Write records to path, returning the number written. The count in
+    #  the prefix is filled in at the end, so records can be any iterable.
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(_records_header(cls, 0))
+        chunk = []
+        for data in _packed_records(cls, records):
+            chunk.append(data)
+            if len(chunk) == 4096:
+                f.write(b''.join(chunk))
+                count += len(chunk)
+                chunk = []
+        f.write(b''.join(chunk))
+        count += len(chunk)
+        f.seek(0)
+        f.write(_records_header(cls, count))
+    return count
+
+def _nls_open_file(cls, path, writable=False):
+    import mmap
+    with open(path, 'r+b' if writable else 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+    try:
+        count, offset = _read_records_header(cls, buf)
+    except Exception:
+        buf.close()
+        raise
+    return _RecordFile(cls, buf, offset, range(count))
+
+
+# A read-only sequence of the records of cls in buf, starting at
+#  offset. indices is a range of the record numbers in the sequence, so
+#  that slicing is O(1). Records are decoded lazily: indexing returns a
+#  view created with cls._at.
+class _RecordSequence(_collections_abc.Sequence):
+    def __init__(self, cls, buf, offset, indices):
+        self._cls = cls
+        self._buf = buf
+        self._offset = offset
+        self._indices = indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self._subsequence(self._indices[idx])
+        return self._cls._at(self._buf, self._indices[idx], self._offset)
+
+    def _subsequence(self, indices):
+        return _RecordSequence(self._cls, self._buf, self._offset, indices)
+
+    def __iter__(self):
+        at = self._cls._at
+        buf = self._buf
+        offset = self._offset
+        for idx in self._indices:
+            yield at(buf, idx, offset)
+
+    def __repr__(self):
+        return '<{0} of {1} {2} records>'.format(self.__class__.__name__, len(self),
+                                                 self._cls.__name__)
+
+# The records in a file opened with _open_file. Closing it unmaps the
+#  file, after which none of its records or slices can be used.
+class _RecordFile(_RecordSequence):
+    def close(self):
+        self._buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+########################################################################
+# Tables of records in shared memory, for classes with struct storage.
+# The shared memory holds a record file: the same header as
+#  _dump_file() writes, followed by the records. This lets another
+#  process attach to it by name and check that it has the right class.
+# Pickling a table only pickles its name and the range of records in it,
+#  so sending a slice of a table to a multiprocessing worker is cheap.
+
+class SharedRecordTable(_RecordSequence):
+    """A fixed size table of records of a class with struct storage,
+    stored in shared memory. Use create(), from_records() or attach()
+    to make one. Indexing returns views into the shared memory."""
+
+    def __init__(self, cls, shm, offset, indices):
+        _RecordSequence.__init__(self, cls, shm.buf, offset, indices)
+        self._shm = shm
+
+    @classmethod
+    def create(cls, record_type, count, name=None):
+        """Create a new table with room for count records, which are
+        initially all zero bytes."""
+        from multiprocessing import shared_memory
+        header = _records_header(record_type, count)
+        shm = shared_memory.SharedMemory(name=name, create=True,
+                                         size=max(len(header) + count * record_type._struct.size, 1))
+        shm.buf[:len(header)] = header
+        return cls(record_type, shm, len(header), range(count))
+
+    @classmethod
+    def from_records(cls, record_type, records, name=None):
+        """Create a new table containing records."""
+        data = b''.join(_packed_records(record_type, records))
+        table = cls.create(record_type, len(data) // record_type._struct.size, name)
+        table._buf[table._offset:table._offset + len(data)] = data
+        return table
+
+    @classmethod
+    def attach(cls, record_type, name, indices=None):
+        """Attach to the existing table called name."""
+        from multiprocessing import shared_memory
+        try:
+            # Python 3.13 and later: don't let this process's resource
+            #  tracker unlink the memory when it exits, only its creator
+            #  should do that.
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        try:
+            count, offset = _read_records_header(record_type, shm.buf)
+        except Exception:
+            shm.close()
+            raise
+        return cls(record_type, shm, offset, range(count) if indices is None else indices)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __setitem__(self, idx, record):
+        start = self._offset + self._indices[idx] * self._cls._struct.size
+        data = next(_packed_records(self._cls, [record]))
+        self._buf[start:start + len(data)] = data
+
+    def _subsequence(self, indices):
+        return SharedRecordTable(self._cls, self._shm, self._offset, indices)
+
+    def __reduce__(self):
+        return (_attach_shared_record_table, (self._cls, self.name, self._indices))
+
+    def close(self):
+        """Detach from the shared memory. Views of its records can't be
+        used after this."""
+        self._buf = None
+        self._shm.close()
+
+    def unlink(self):
+        """Destroy the shared memory. Only the creator should call this,
+        once all processes have closed it."""
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _attach_shared_record_table(record_type, name, indices):
+    return SharedRecordTable.attach(record_type, name, indices)
+
+
+# Add the struct storage members to type_dict.
+def _nls_update_type_dict(type_dict, fields, defaults, markers, kwdefaults, types, use_slots):
+    if None in types:
+        raise ValueError("storage='struct' requires a type for every field: "
+                         "{0!r}".format(types))
+    if set(types) & set(_VARIABLE_TYPES):
+        raise ValueError("storage='struct' requires a fixed size type for every field: "
+                         "{0!r}".format(types))
+    record_struct = _struct.Struct('<' + ''.join(types))
+    globals_ = dict(_FACTORY_GLOBALS, _bytearray=bytearray, _pack=record_struct.pack)
+    make, make_many = _nl_make_constructors(fields, globals_, True)
+    type_dict.update({'__init__': _make_init_fn('__init__', _nls_init_builder, fields, defaults,
+                                                markers, kwdefaults, globals_),
+                      '__iter__': _nls_iter,
+                      '__eq__': _nls_eq,
+                      '__getstate__': _nls_getstate,
+                      '__setstate__': _nls_setstate,
+                      '__bytes__': _nls_getstate,
+                      '_make': make,
+                      '_make_many': make_many,
+                      '_frombytes': classmethod(_nls_frombytes),
+                      '_at': classmethod(_nls_at),
+                      '_dump_file': classmethod(_nls_dump_file),
+                      '_open_file': classmethod(_nls_open_file),
+                      '_struct': record_struct})
+
+    offset = 0
+    for idx, (field, code) in enumerate(zip(fields, types)):
+        type_dict[field] = _nls_property(idx, code, offset)
+        offset += _struct.calcsize('<' + code)
+
+    if use_slots:
+        type_dict['__slots__'] = ('_buf', '_offset')
+
+
+########################################################################
+# An optional cache of the generated classes, so that asking for the
+#  same class again is a dict lookup instead of building a new class.
+
+# Given field_names, as passed to the factory functions, return a
+#  hashable key and the field_names to use instead of the original,
+#  which may have been an iterator. Defaults are keyed on their identity,
+#  since they need not be hashable. Returns a key of None if field_names
+#  is malformed, leaving it to _fields_and_defaults to report the error.
+def _field_names_key(field_names):
+    if isinstance(field_names, _basestring):
+        return tuple(field_names.replace(',', ' ').split()), field_names
+
+    if isinstance(field_names, _collections_abc.Mapping):
+        field_names = list(field_names.items())
+    else:
+        field_names = list(field_names)
+
+    key = []
+    try:
+        for field_name in field_names:
+            if isinstance(field_name, _basestring):
+                key.append(field_name)
+            else:
+                key.append((field_name[0], tuple(id(value) for value in field_name[1:])))
+        key = tuple(key)
+        hash(key)
+    except (TypeError, IndexError, KeyError):
+        key = None
+    return key, field_names
+
+# Options, like types, may be given as lists or mappings. Key them on
+#  their contents.
+def _option_key(option):
+    if isinstance(option, _collections_abc.Mapping):
+        return tuple(option.items())
+    if isinstance(option, list):
+        return tuple(option)
+    return option
+
+class _TypeCache(object):
+    def __init__(self, maxsize=0):
+        self._lock = _thread.allocate_lock()
+        self._maxsize = maxsize
+        self._entries = _OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def resize(self, maxsize):
+        """Set the maximum number of cached classes. None means the cache
+        is unbounded, 0 disables the cache."""
+        if maxsize is not None and maxsize < 0:
+            raise ValueError('maxsize must be None or >= 0: {0!r}'.format(maxsize))
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Remove all classes from the cache and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+    def info(self):
+        """Report cache statistics, like functools.lru_cache."""
+        with self._lock:
+            return _cache_info(self._hits, self._misses, self._maxsize, len(self._entries))
+
+    def _evict(self):
+        if self._maxsize is not None:
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    # Return the class made by make(typename, field_names, default,
+    #  *options), from the cache if possible.
+    def _lookup(self, make, kind, typename, field_names, default, *options):
+        if self._maxsize == 0:
+            with self._lock:
+                self._misses += 1
+            return make(typename, field_names, default, *options)
+
+        fields_key, field_names = _field_names_key(field_names)
+        key = None
+        if fields_key is not None:
+            key = (kind, typename, fields_key, id(default)) + tuple(map(_option_key, options))
+            try:
+                hash(key)
+            except TypeError:
+                key = None
+        deferred = getattr(_batch, 'cached', None)
+        if key is not None:
+            with self._lock:
+                entry = self._entries.pop(key, None)
+                if entry is None and deferred is not None:
+                    entry = deferred.get(key)
+                elif entry is not None:
+                    # Move it to the most recently used position.
+                    self._entries[key] = entry
+                if entry is not None:
+                    self._hits += 1
+                    return entry[0]
+        with self._lock:
+            self._misses += 1
+
+        cls = make(typename, field_names, default, *options)
+
+        if key is not None:
+            # Hold on to field_names and default, so that the ids of the
+            #  defaults in the key stay valid while it's cached.
+            entry = (cls, field_names, default)
+            if deferred is not None:
+                # The class's functions aren't compiled yet. make_types
+                #  adds it to the cache once they are.
+                deferred[key] = entry
+            else:
+                self._add([(key, entry)])
+        return cls
+
+    def _add(self, items):
+        with self._lock:
+            for key, entry in items:
+                self._entries[key] = entry
+            self._evict()
+
+# The cache is disabled by default. Enable it with
+#  type_cache.resize(maxsize).
+type_cache = _TypeCache()
+
+
 ########################################################################
 # The actual namedlist factory function.
 def namedlist(typename, field_names, default=NO_DEFAULT, rename=False,
-              use_slots=True):
+              use_slots=True, types=None, storage=None, order=False, frozen=False,
+              cache_hash=False, module=None):
     typename = str(typename) # for python 2.x
-    fields, defaults = _fields_and_defaults(typename, field_names, default, rename)
-
-    type_dict = {'__init__': _make_fn('__init__', _nl_init, fields, defaults),
-                 '__eq__': _nl_eq,
+    if module is None:
+        module = _caller_module(1)
+    return type_cache._lookup(_namedlist, 'namedlist', typename, field_names, default,
+                              rename, use_slots, types, storage, bool(order), bool(frozen),
+                              bool(cache_hash), module)
+
+def _namedlist(typename, field_names, default, rename, use_slots, types, storage, order,
+               frozen, cache_hash, module):
+    if storage not in (None, 'struct'):
+        raise ValueError("storage must be None or 'struct': {0!r}".format(storage))
+    if frozen and not use_slots:
+        raise ValueError('frozen=True requires use_slots=True')
+    if frozen and storage is not None:
+        raise ValueError("frozen=True is not supported with storage={0!r}".format(storage))
+    if cache_hash and not frozen:
+        raise ValueError('cache_hash=True requires frozen=True')
+    fields, defaults, markers, kwdefaults = _parse_fields(typename, field_names, default, rename)
+    types = _parse_types(fields, types)
+
+    globals_ = {}
+    make, make_many = _nl_make_constructors(fields, globals_, frozen=frozen)
+    getters = tuple(map(_operator.attrgetter, fields))
+    getitem, setitem = _nl_make_item_fns(getters, fields)
+    type_dict = {'__init__': _nl_make_init(fields, defaults, globals_, frozen, markers, kwdefaults),
+                 '__eq__': _nl_make_eq(fields),
                  '__ne__': _nl_ne,
                  '__len__': _nl_len,
-                 '__getstate__': _nl_getstate,
+                 '__getstate__': _make_fn('__getstate__', _nl_getstate_builder, fields, [], {}),
                  '__setstate__': _nl_setstate,
-                 '__getitem__': _nl_getitem,
-                 '__setitem__': _nl_setitem,
-                 '__iter__': _nl_iter,
+                 '__getitem__': getitem,
+                 '__setitem__': setitem,
+                 '__iter__': _make_fn('__iter__', _nl_iter_builder, fields, [], {'_iter': iter}),
                  '__hash__': None,
                  'count': _nl_count,
                  'index': _nl_index,
                  '_update': _nl_update,
-                 '_replace': _nl_replace}
-    type_dict.update(_common_fields(fields, _build_docstring(typename, fields, defaults)))
-
-    if use_slots:
+                 '_replace': _nl_replace,
+                 '_set_many': _nl_set_many,
+                 '_make': make,
+                 '_make_many': make_many,
+                 '_to_json_lines': classmethod(_to_json_lines),
+                 '_from_json_lines': classmethod(_from_json_lines),
+                 '_csv_reader': classmethod(_csv_reader),
+                 '_csv_writer': classmethod(_csv_writer),
+                 '_getters': getters,
+                 '_types': types}
+    type_dict.update(_common_fields(fields, _build_docstring(typename, fields, defaults,
+                                                            markers, kwdefaults), module))
+    if order:
+        type_dict.update(_nl_make_order(fields))
+
+    if storage is None:
+        globals_['_make_instance'] = _nl_make_instance
+        type_dict['__reduce__'] = _make_fn('__reduce__', _nl_reduce_builder, fields, [],
+                                           globals_, bool(markers[1]))
+
+    if storage == 'struct':
+        _nls_update_type_dict(type_dict, fields, defaults, markers, kwdefaults, types, use_slots)
+    elif frozen:
+        _nlf_update_type_dict(type_dict, fields, globals_, cache_hash)
+    elif use_slots:
         type_dict['__slots__'] = fields
 
     # Create the new type object.
     t = type(typename, (object,), type_dict)
+    if frozen:
+        _nlf_bind_setters(t, fields, globals_, cache_hash)
+    if storage is None:
+        # For __reduce__, to tell whether a subclass overrides __init__.
+        globals_['_init'] = t.__init__
 
     # Register its ABC's
     _collections_abc.Sequence.register(t)
@@ -430,13 +1712,76 @@ def namedlist(typename, field_names, default=NO_DEFAULT, rename=False,
     return t
 
 
+########################################################################
+# Lists of records of one namedlist class.
+# Pickling a list of records pickles a reference to the class and the
+#  tuple of fields for every record. A RecordBatch pickles the class
+#  once, followed by one list per column, and unpickles with _make_many.
+
+# A context manager that disables garbage collection while many records
+#  are created, and restores it afterwards. Otherwise a collection would
+#  run every few hundred records, none of which can free anything.
+# It's only used around steps that do no I/O and call no user code, such
+#  as converters, whose garbage couldn't be collected until the end.
+class _gc_paused(object):
+    __slots__ = ('_enabled',)
+
+    def __enter__(self):
+        import gc
+        self._enabled = gc.isenabled()
+        gc.disable()
+
+    def __exit__(self, *exc_info):
+        if self._enabled:
+            import gc
+            gc.enable()
+
+class RecordBatch(list):
+    """A list of instances of record_type, a class created by
+    namedlist, which pickles as one list per field."""
+
+    __slots__ = ('record_type',)
+
+    def __init__(self, record_type, records=()):
+        list.__init__(self, records)
+        self.record_type = record_type
+
+    def _columns(self):
+        """Return a list of the values of each field, in the order of
+        record_type._fields."""
+        return [list(map(getter, self)) for getter in self.record_type._getters]
+
+    def __reduce__(self):
+        return (_make_record_batch, (self.record_type, len(self), self._columns()))
+
+    def __repr__(self):
+        return '{0}({1}, {2})'.format(self.__class__.__name__, self.record_type.__name__,
+                                      list.__repr__(self))
+
+def _make_record_batch(record_type, count, columns):
+    # zip() of no columns would lose the number of records.
+    rows = zip(*columns) if columns else [()] * count
+    with _gc_paused():
+        return RecordBatch(record_type, record_type._make_many(rows))
+
+
 ########################################################################
 # namedtuple methods
-def _nt_new(cls, *args):
-    # sets all of the fields to their passed in values
-    assert len(args) == len(cls._fields)
-    values = [value for _, value in _get_values(cls._fields, args)]
-    return tuple.__new__(cls, values)
+
+# Build the __new__ function. Like collections.namedtuple, it passes
+#  its arguments straight to tuple.__new__, calling the FACTORY only for
+#  those fields that have a FACTORY default.
+def _nt_new_builder(fields, factory_flags):
+    values = _ast.Tuple(elts=[_field_value(field, has_factory)
+                              for field, has_factory in zip(fields, factory_flags)],
+                        ctx=_ast.Load())
+    body = [_ast.Return(value=_call(_load('_tuple_new'), [_load('_cls'), values]))]
+    return ['_cls'] + list(fields), body
+
+def _nt_make_new(fields, defaults):
+    globals_ = dict(_FACTORY_GLOBALS, _tuple_new=tuple.__new__)
+    return _make_fn('__new__', _nt_new_builder, fields, defaults, globals_,
+                    tuple(_factory_flags(fields, defaults)))
 
 def _nt_replace(_self, **kwds):
     result = _self._make(map(kwds.pop, _self._fields, _self))
@@ -458,25 +1803,29 @@ def _nt_getstate(self):
     'Exclude the OrderedDict from pickling'
     return None
 
-def _get_values(fields, args):
-    # Returns [(fieldname, value)]. If the value is a FACTORY, call it.
-    assert len(fields) == len(args)
-    return [(fieldname, (value._callable() if isinstance(value, FACTORY) else value))
-            for fieldname, value in zip(fields, args)]
-
 ########################################################################
 # The actual namedtuple factory function.
-def namedtuple(typename, field_names, default=NO_DEFAULT, rename=False):
+def namedtuple(typename, field_names, default=NO_DEFAULT, rename=False, module=None):
     typename = str(typename) # for python 2.x
+    if module is None:
+        module = _caller_module(1)
+    return type_cache._lookup(_namedtuple, 'namedtuple', typename, field_names, default,
+                              rename, module)
+
+def _namedtuple(typename, field_names, default, rename, module):
     fields, defaults = _fields_and_defaults(typename, field_names, default, rename)
 
-    type_dict = {'__new__': _make_fn('__new__', _nt_new, fields, defaults),
+    type_dict = {'__new__': _nt_make_new(fields, defaults),
                  '__getnewargs__': _nt_getnewargs,
                  '__getstate__': _nt_getstate,
                  '_replace': _nt_replace,
                  '_make': classmethod(_nt_make),
+                 '_to_json_lines': classmethod(_to_json_lines),
+                 '_from_json_lines': classmethod(_from_json_lines),
+                 '_csv_reader': classmethod(_csv_reader),
+                 '_csv_writer': classmethod(_csv_writer),
                  '__slots__': ()}
-    type_dict.update(_common_fields(fields, _build_docstring(typename, fields, defaults)))
+    type_dict.update(_common_fields(fields, _build_docstring(typename, fields, defaults), module))
 
     # Create each field property.
     for idx, field in enumerate(fields):
@@ -485,3 +1834,820 @@ def namedtuple(typename, field_names, default=NO_DEFAULT, rename=False):
 
     # Create the new type object.
     return type(typename, (tuple,), type_dict)
+
+
+########################################################################
+# namedlist_array methods.
+# A namedlist_array stores each field in its own column: an array.array
+#  if the field's type is an array typecode, otherwise a list. Indexing
+#  returns a row, which is a view of one position in all of the columns.
+
+def _nla_append_row(self, values):
+    # Append one value to each column. If a value can't be stored (for
+    #  example, a float in an integer column), remove the values already
+    #  appended, so the columns stay the same length.
+    columns = self._columns
+    for idx, value in enumerate(values):
+        try:
+            columns[idx].append(value)
+        except Exception:
+            for column in columns[:idx]:
+                column.pop()
+            raise
+
+# Build append. It has the same signature as the __init__ of a
+#  namedlist with the same fields.
+def _nla_append_builder(fields, factory_flags):
+    values = _ast.Tuple(elts=[_field_value(field, has_factory)
+                              for field, has_factory in zip(fields, factory_flags)],
+                        ctx=_ast.Load())
+    body = [_ast.Expr(value=_call(_load('_append_row'), [_load('_self'), values]))]
+    return ['_self'] + list(fields), body
+
+def _nla_init(self, rows=()):
+    typecodes = _array_typecodes()
+    self._columns = tuple(_array.array(code) if code in typecodes else []
+                          for code in self._types)
+    self.extend(rows)
+
+def _nla_extend(self, rows):
+    # Add each column's values in one call. Every row must contain a
+    #  value for every field.
+    if not isinstance(rows, (list, tuple)):
+        rows = list(rows)
+    nfields = len(self._fields)
+    if set(map(len, rows)) - set([nfields]):
+        raise ValueError('every row must have {0} values'.format(nfields))
+
+    columns = self._columns
+    length = len(self)
+    try:
+        for column, values in zip(columns, zip(*rows)):
+            column.extend(values)
+    except Exception:
+        for column in columns:
+            del column[length:]
+        raise
+
+def _nla_len(self):
+    return len(self._columns[0])
+
+def _nla_getitem(self, idx):
+    if isinstance(idx, slice):
+        result = object.__new__(self.__class__)
+        result._columns = tuple(column[idx] for column in self._columns)
+        return result
+    return self._row_type(self, idx)
+
+def _nla_setitem(self, idx, row):
+    row = tuple(row)
+    if len(row) != len(self._fields):
+        raise ValueError('row must have {0} values'.format(len(self._fields)))
+    row_view = self._row_type(self, idx)
+    old = tuple(row_view)
+    try:
+        for column, value in zip(self._columns, row):
+            column[row_view._index] = value
+    except Exception:
+        for column, value in zip(self._columns, old):
+            column[row_view._index] = value
+        raise
+
+def _nla_iter(self):
+    row_type = self._row_type
+    return (row_type(self, idx) for idx in range(len(self)))
+
+def _nla_column(self, name):
+    try:
+        return self._columns[self._fields.index(name)]
+    except ValueError:
+        raise KeyError(name)
+
+def _nla_repr(self):
+    return '{0}([{1}])'.format(self.__class__.__name__, ', '.join(map(repr, self)))
+
+# Methods of the rows, which are views into a namedlist_array.
+
+def _nla_row_init(self, array, idx):
+    length = len(array)
+    if idx < 0:
+        idx += length
+    if not 0 <= idx < length:
+        raise IndexError('{0} index out of range'.format(array.__class__.__name__))
+    self._array = array
+    self._index = idx
+
+def _nla_row_iter(self):
+    idx = self._index
+    return iter([column[idx] for column in self._array._columns])
+
+def _nla_row_eq(self, other):
+    return isinstance(other, self.__class__) and tuple(self) == tuple(other)
+
+def _nla_row_ne(self, other):
+    return not _nla_row_eq(self, other)
+
+def _nla_row_getitem(self, idx):
+    if isinstance(idx, slice):
+        return list(self)[idx]
+    return self._array._columns[idx][self._index]
+
+def _nla_row_setitem(self, idx, value):
+    self._array._columns[idx][self._index] = value
+
+def _nla_row_property(idx):
+    def get(self):
+        return self._array._columns[idx][self._index]
+    def set(self, value):
+        self._array._columns[idx][self._index] = value
+    return property(get, set, doc='Alias for field number {0}'.format(idx))
+
+# The array.array typecodes that hold numbers, and that this Python's
+#  array module supports. Python 2's has no 'q' or 'Q', and no
+#  array.typecodes. Columns of other types are stored in lists.
+def _array_typecodes():
+    return frozenset('bBhHiIlLqQfd').intersection(getattr(_array, 'typecodes', 'bBhHiIlLfd'))
+
+########################################################################
+# The actual namedlist_array factory function.
+def namedlist_array(typename, field_names, default=NO_DEFAULT, rename=False,
+                    types=None, module=None):
+    typename = str(typename) # for python 2.x
+    if module is None:
+        module = _caller_module(1)
+    return type_cache._lookup(_namedlist_array, 'namedlist_array', typename, field_names,
+                              default, rename, types, module)
+
+def _namedlist_array(typename, field_names, default, rename, types, module):
+    fields, defaults = _fields_and_defaults(typename, field_names, default, rename)
+    if not fields:
+        raise ValueError('namedlist_array requires at least one field')
+    types = _parse_types(fields, types)
+    docstr = _build_docstring(typename, fields, defaults)
+
+    row_dict = {'__init__': _nla_row_init,
+                '__eq__': _nla_row_eq,
+                '__ne__': _nla_row_ne,
+                '__len__': _nl_len,
+                '__getitem__': _nla_row_getitem,
+                '__setitem__': _nla_row_setitem,
+                '__iter__': _nla_row_iter,
+                '__hash__': None,
+                '__slots__': ('_array', '_index'),
+                'count': _nl_count,
+                'index': _nl_index}
+    row_dict.update(_common_fields(fields, docstr, module))
+    for idx, field in enumerate(fields):
+        row_dict[field] = _nla_row_property(idx)
+    row_type = type(typename, (object,), row_dict)
+    _collections_abc.Sequence.register(row_type)
+
+    array_dict = {'__init__': _nla_init,
+                  '__len__': _nla_len,
+                  '__getitem__': _nla_getitem,
+                  '__setitem__': _nla_setitem,
+                  '__iter__': _nla_iter,
+                  '__repr__': _nla_repr,
+                  '__doc__': 'Columnar array of {0}'.format(docstr),
+                  '__slots__': ('_columns',),
+                  'append': _make_fn('append', _nla_append_builder, fields, defaults,
+                                     dict(_FACTORY_GLOBALS, _append_row=_nla_append_row),
+                                     tuple(_factory_flags(fields, defaults))),
+                  'extend': _nla_extend,
+                  '_column': _nla_column,
+                  '_fields': fields,
+                  '_types': types,
+                  '_row_type': row_type}
+    if module is not None:
+        array_dict['__module__'] = module
+    return type(typename + 'Array', (object,), array_dict)
+
+
+########################################################################
+# Create many classes at once.
+
+def make_types(specs, module=None):
+    """Create a class for each spec, and return a list of the classes.
+
+    Each spec is a tuple (factory, typename, field_names) or (factory,
+    typename, field_names, kwds), where factory is namedlist, namedtuple
+    or namedlist_array, and kwds is a dict of its keyword arguments.
+    The generated functions of all of the classes are compiled
+    together, once all of the classes have been created. If any spec
+    is invalid, no classes are returned. module is the __module__ of
+    the classes, by default the caller's module."""
+    if module is None:
+        module = _caller_module(1)
+
+    checked = []
+    for spec in specs:
+        if len(spec) not in (3, 4):
+            raise ValueError('spec must be (factory, typename, field_names) or '
+                             '(factory, typename, field_names, kwds): {0!r}'.format(spec))
+        factory, typename, field_names = spec[:3]
+        kwds = dict(spec[3]) if len(spec) == 4 else {}
+        if factory not in (namedlist, namedtuple, namedlist_array):
+            raise ValueError('factory must be namedlist, namedtuple or namedlist_array: '
+                             '{0!r}'.format(factory))
+        kwds.setdefault('module', module)
+        checked.append((factory, typename, field_names, kwds))
+
+    # Classes are added to type_cache only once their functions are
+    #  compiled, so other threads never get one that isn't finished,
+    #  and none are cached if a spec fails.
+    previous = getattr(_batch, 'pending', None), getattr(_batch, 'cached', None)
+    _batch.pending, _batch.cached = {}, _OrderedDict()
+    try:
+        classes = [factory(typename, field_names, **kwds)
+                   for factory, typename, field_names, kwds in checked]
+        _compile_pending(_batch.pending)
+        type_cache._add(_batch.cached.items())
+    finally:
+        _batch.pending, _batch.cached = previous
+    return classes
+
+
+########################################################################
+# Binary codecs, which write a stream of records to a file and read
+#  them back. The stream starts with a fixed size prefix: a magic number
+#  and the size of the header. The header is JSON, describing the fields
+#  and their types, like the header of a record file.
+# Records follow in blocks of up to _CODEC_BLOCK_SIZE records, stored by
+#  column. A block starts with the number of records, and the size and
+#  format of each str or bytes column. Then each column follows, in the
+#  order of the fields:
+#  - A fixed size column is packed with struct, as one value per record.
+#  - A str or bytes column is normally its values joined by NUL
+#    characters, encoded as UTF-8 for str. If a value contains a NUL,
+#    the column is instead the length of each value, followed by the
+#    values concatenated. The lengths of str values are in characters.
+# Encoding and decoding a block don't run any Python code per record,
+#  apart from the class's __init__ or __new__.
+
+_CODEC_MAGIC = b'NLCODE\x00\x01'
+_CODEC_PREFIX = '<8sI'
+_CODEC_BLOCK_SIZE = 4096
+
+# The formats of str and bytes columns.
+_CODEC_JOINED = 0
+_CODEC_LENGTHS = 1
+
+# Return the prefix and header of a stream of records.
+def _codec_header(record_type, types):
+    import json
+    header = json.dumps({'typename': record_type.__name__,
+                         'fields': list(record_type._fields),
+                         'types': list(types)}).encode('utf-8')
+    return _struct.pack(_CODEC_PREFIX, _CODEC_MAGIC, len(header)) + header
+
+# Read size bytes from fileobj, which may return fewer bytes than asked
+#  for, like a socket. Returns fewer than size bytes only at the end of
+#  the file.
+def _read_exactly(fileobj, size):
+    data = fileobj.read(size)
+    if len(data) == size or not data:
+        return data
+    chunks = [data]
+    size -= len(data)
+    while size:
+        data = fileobj.read(size)
+        if not data:
+            break
+        chunks.append(data)
+        size -= len(data)
+    return b''.join(chunks)
+
+# Read the prefix and header of a stream from fileobj, and check that
+#  its fields and types match.
+def _read_codec_header(fileobj, record_type, types):
+    import json
+    prefix_size = _struct.calcsize(_CODEC_PREFIX)
+    prefix = _read_exactly(fileobj, prefix_size)
+    if len(prefix) < prefix_size:
+        raise ValueError('not a record stream: too short')
+    magic, header_size = _struct.unpack(_CODEC_PREFIX, prefix)
+    if magic != _CODEC_MAGIC:
+        raise ValueError('not a record stream: bad magic number {0!r}'.format(magic))
+    data = _read_exactly(fileobj, header_size)
+    if len(data) < header_size:
+        raise ValueError('record stream is truncated')
+    header = json.loads(data.decode('utf-8'))
+    if tuple(header['fields']) != record_type._fields or tuple(header['types']) != types:
+        raise ValueError('records have fields {0!r} and types {1!r}, expected {2!r} and '
+                         '{3!r}'.format(header['fields'], header['types'],
+                                        list(record_type._fields), list(types)))
+
+# Split data into pieces of the given lengths.
+def _split(data, lengths):
+    if _PY2:
+        stops = []
+        stop = 0
+        for length in lengths:
+            stop += length
+            stops.append(stop)
+    else:
+        stops = list(_itertools.accumulate(lengths))
+    return list(_map(data.__getitem__, _map(slice, _itertools.chain((0,), stops), stops)))
+
+# Whether record_type can be called with the value of every field as a
+#  positional argument, which is the fastest way to create an instance.
+def _positional_constructor(record_type):
+    constructor = record_type.__new__ if issubclass(record_type, tuple) else record_type.__init__
+    return getattr(getattr(constructor, '__code__', None), 'co_kwonlyargcount', 0) == 0
+
+class _Codec(object):
+    def __init__(self, record_type, types):
+        self.record_type = record_type
+        self.types = types
+        self._variable_count = sum(code in _VARIABLE_TYPES for code in types)
+        self._block_struct = _struct.Struct('<I' + 'IB' * self._variable_count)
+        self._positional = _positional_constructor(record_type)
+        # The struct for a column of each fixed size type, for each number
+        #  of records.
+        self._column_structs = {}
+
+    def _column_struct(self, code, count):
+        key = code, count
+        column_struct = self._column_structs.get(key)
+        if column_struct is None:
+            column_struct = _struct.Struct('<' + ' '.join([code] * count))
+            self._column_structs[key] = column_struct
+        return column_struct
+
+    def _encode_block(self, rows):
+        count = len(rows)
+        if set(map(len, rows)) - set([len(self.types)]):
+            raise ValueError('every record must have {0} values'.format(len(self.types)))
+        prefix = [count]
+        columns = []
+        for code, column in zip(self.types, zip(*rows)):
+            if code not in _VARIABLE_TYPES:
+                columns.append(self._column_struct(code, count).pack(*column))
+                continue
+            separator = u'\x00' if code == 'str' else b'\x00'
+            data = separator.join(column)
+            if data.count(separator) == count - 1:
+                column_format = _CODEC_JOINED
+            else:
+                column_format = _CODEC_LENGTHS
+                data = separator[:0].join(column)
+            if code == 'str':
+                data = data.encode('utf-8')
+            if column_format == _CODEC_LENGTHS:
+                data = self._column_struct('I', count).pack(*map(len, column)) + data
+            prefix += [len(data), column_format]
+            columns.append(data)
+        return b''.join([self._block_struct.pack(*prefix)] + columns)
+
+    # Read the block whose prefix has been read, and return a list of the
+    #  values of each column.
+    def _read_block(self, fileobj, prefix):
+        values = self._block_struct.unpack(prefix)
+        count = values[0]
+        sizes = iter(values[1::2])
+        formats = iter(values[2::2])
+        columns = []
+        for code in self.types:
+            if code not in _VARIABLE_TYPES:
+                column_struct = self._column_struct(code, count)
+                data = _read_exactly(fileobj, column_struct.size)
+                if len(data) < column_struct.size:
+                    raise ValueError('record stream is truncated')
+                columns.append(column_struct.unpack(data))
+                continue
+            size = next(sizes)
+            column_format = next(formats)
+            data = _read_exactly(fileobj, size)
+            if len(data) < size:
+                raise ValueError('record stream is truncated')
+            if column_format == _CODEC_JOINED:
+                if code == 'str':
+                    column = data.decode('utf-8').split(u'\x00')
+                else:
+                    column = data.split(b'\x00')
+            elif column_format == _CODEC_LENGTHS:
+                lengths_struct = self._column_struct('I', count)
+                lengths = lengths_struct.unpack_from(data)
+                data = data[lengths_struct.size:]
+                if code == 'str':
+                    data = data.decode('utf-8')
+                column = _split(data, lengths)
+            else:
+                raise ValueError('record stream has an unknown column format '
+                                 '{0!r}'.format(column_format))
+            if len(column) != count:
+                raise ValueError('record stream has {0} values in a column of {1} '
+                                 'records'.format(len(column), count))
+            columns.append(column)
+        return columns
+
+    # The records of a block, from the columns returned by _read_block.
+    def _make_records(self, columns):
+        if self._positional:
+            return list(map(self.record_type, *columns))
+        return self.record_type._make_many(zip(*columns))
+
+    def dump(self, records, fileobj):
+        """Write a header and then records to fileobj, which must be
+        open in binary mode. Records can be instances of the class or
+        any other sequences of values. Returns the number of records
+        written."""
+        fileobj.write(_codec_header(self.record_type, self.types))
+        count = 0
+        records = iter(records)
+        while True:
+            rows = list(_itertools.islice(records, _CODEC_BLOCK_SIZE))
+            if not rows:
+                return count
+            fileobj.write(self._encode_block(rows))
+            count += len(rows)
+
+    def load(self, fileobj):
+        """Read the header from fileobj, which must match the class and
+        types, and then yield its records as instances of the class.
+        Records are read a block at a time, so fileobj can be a pipe or
+        a socket."""
+        _read_codec_header(fileobj, self.record_type, self.types)
+        prefix_size = self._block_struct.size
+        while True:
+            prefix = _read_exactly(fileobj, prefix_size)
+            if not prefix:
+                return
+            if len(prefix) < prefix_size:
+                raise ValueError('record stream is truncated')
+            columns = self._read_block(fileobj, prefix)
+            with _gc_paused():
+                records = self._make_records(columns)
+            for record in records:
+                yield record
+
+    def __repr__(self):
+        return 'codec({0}, {1!r})'.format(self.record_type.__name__, ' '.join(self.types))
+
+def codec(record_type, types=None):
+    """Return a codec for record_type, a class created by namedlist or
+    namedtuple, which writes records to a binary file with dump() and
+    reads them back with load(). types gives the type of each field, as
+    for namedlist: a struct format character, or 'str' or 'bytes' for
+    values of any length. By default, it's the types of the class."""
+    fields = record_type._fields
+    if types is None:
+        types = getattr(record_type, '_types', (None,) * len(fields))
+    else:
+        types = _parse_types(fields, types)
+    if not fields:
+        raise ValueError('codec requires at least one field')
+    if None in types:
+        raise ValueError('codec requires a type for every field: {0!r}'.format(types))
+    return _Codec(record_type, tuple(types))
+
+
+########################################################################
+# JSON Lines: one JSON value per line for each record, which is either
+#  an object mapping the field names to the values, or an array of the
+#  values.
+# Each record is encoded by a generated function that fills in a
+#  template, which has the field names already encoded. Fields with a
+#  declared integer, floating point or 'str' type are encoded with
+#  int.__repr__, float.__repr__ and the json module's string escaping,
+#  and the other fields with a json.JSONEncoder.
+# Decoding reads lines in chunks, and decodes each chunk as a single JSON
+#  array, instead of decoding each line separately.
+
+_JSON_MODES = ('object', 'array')
+_JSON_CHUNK_SIZE = 1 << 20
+
+# Build the function that encodes a record. kinds has the _value_kind of
+#  each field:
+#  ts, px, sym, data = _row
+#  return _template % (_int_repr(ts) if ts.__class__ is _int else _encode(ts),
+#                      _float_repr(px) if px.__class__ is _float and
+#                                         _min_float < px < _max_float else _encode(px),
+#                      _escape(sym) if sym.__class__ is _str else _encode(sym),
+#                      _encode(data))
+# Values of any other class, like None, bools, or ints in float fields,
+#  are left to _encode, and so are infinite and NaN values. It encodes
+#  them the same way as the json module.
+def _json_encode_builder(fields, kinds):
+    def is_class(field, name):
+        return _ast.Compare(left=_attribute(field, '__class__', _ast.Load()), ops=[_ast.Is()],
+                            comparators=[_load(name)])
+
+    values = []
+    for field, kind in zip(fields, kinds):
+        encode = _call(_load('_encode'), [_load(field)])
+        if kind == 'int':
+            values.append(_ast.IfExp(test=is_class(field, '_int'),
+                                     body=_call(_load('_int_repr'), [_load(field)]),
+                                     orelse=encode))
+        elif kind == 'float':
+            finite = _ast.Compare(left=_load('_min_float'), ops=[_ast.Lt(), _ast.Lt()],
+                                  comparators=[_load(field), _load('_max_float')])
+            values.append(_ast.IfExp(test=_ast.BoolOp(op=_ast.And(),
+                                                      values=[is_class(field, '_float'), finite]),
+                                     body=_call(_load('_float_repr'), [_load(field)]),
+                                     orelse=encode))
+        elif kind == 'str':
+            values.append(_ast.IfExp(test=is_class(field, '_str'),
+                                     body=_call(_load('_escape'), [_load(field)]),
+                                     orelse=encode))
+        else:
+            values.append(encode)
+    body = [_ast.Assign(targets=[_ast.Tuple(elts=[_store(field) for field in fields],
+                                            ctx=_ast.Store())],
+                        value=_load('_row')),
+            _ast.Return(value=_ast.BinOp(left=_load('_template'), op=_ast.Mod(),
+                                         right=_ast.Tuple(elts=values, ctx=_ast.Load())))]
+    return ['_row'], body
+
+def _check_json_mode(mode):
+    if mode not in _JSON_MODES:
+        raise ValueError("mode must be 'object' or 'array': {0!r}".format(mode))
+
+# Return the function that encodes a record of cls as a line, without
+#  the newline.
+def _json_encoder(cls, mode):
+    import json
+    from json.encoder import encode_basestring_ascii
+    fields = cls._fields
+    if mode == 'object':
+        template = '{' + ','.join(encode_basestring_ascii(field) + ':%s' for field in fields) + '}'
+    else:
+        template = '[' + ','.join(['%s'] * len(fields)) + ']'
+    if not fields:
+        return lambda row: template
+    kinds = tuple(map(_value_kind, getattr(cls, '_types', (None,) * len(fields))))
+    inf = float('inf')
+    return _make_fn('_to_json', _json_encode_builder, fields, [],
+                    {'_template': template,
+                     '_int': int,
+                     '_float': float,
+                     '_str': str,
+                     '_int_repr': int.__repr__ if _PY3 else str,
+                     '_float_repr': float.__repr__,
+                     '_min_float': -inf,
+                     '_max_float': inf,
+                     '_escape': encode_basestring_ascii,
+                     '_encode': json.JSONEncoder(separators=(',', ':')).encode},
+                    kinds)
+
+def _to_json_lines(cls, records, fp, mode='object'):
+    """Write each record to fp, a file open in text mode, as a line of
+    JSON: an object mapping the field names to the values, or with
+    mode='array', an array of the values. Returns the number of
+    records written. Requires Python 3."""
+    _check_json_mode(mode)
+    encode = _json_encoder(cls, mode)
+    count = 0
+    records = iter(records)
+    while True:
+        lines = list(_itertools.islice(_map(encode, records), 4096))
+        if not lines:
+            return count
+        lines.append('')
+        fp.write('\n'.join(lines))
+        count += len(lines) - 1
+
+# Decode the lines of JSON in lines, skipping blank lines, as one JSON
+#  array. If that fails, or a value spans more than one line, find the
+#  first line that can't be decoded on its own, to report its line
+#  number. first is the line number of lines[0].
+def _decode_json_lines(lines, first):
+    import json
+    nonblank = [line for line in lines if not line.isspace()]
+    try:
+        # Like creating the records, decoding does no I/O and calls no
+        #  user code, so the garbage collector is paused for it too.
+        with _gc_paused():
+            values = json.loads('[' + ','.join(nonblank) + ']')
+    except ValueError:
+        values = None
+    if values is not None and len(values) == len(nonblank):
+        return values
+    for idx, line in enumerate(lines):
+        if not line.isspace():
+            try:
+                json.loads(line)
+            except ValueError as exc:
+                raise ValueError('line {0}: {1}'.format(first + idx, exc))
+    raise ValueError('lines {0} to {1}: expected one JSON value on each line'.format(
+        first, first + len(lines) - 1))
+
+# Find the first of the decoded values of lines that can't be a record
+#  with fields, and report its line number.
+def _check_json_values(fields, mode, values, lines, first):
+    numbers = [first + idx for idx, line in enumerate(lines) if not line.isspace()]
+    for number, value in zip(numbers, values):
+        if mode == 'object':
+            if not isinstance(value, dict):
+                raise ValueError('line {0}: expected an object, got {1!r}'.format(number, value))
+            missing = [field for field in fields if field not in value]
+            if missing:
+                raise ValueError('line {0}: missing fields {1!r}'.format(number, missing))
+        else:
+            if not isinstance(value, list):
+                raise ValueError('line {0}: expected an array, got {1!r}'.format(number, value))
+            if len(value) != len(fields):
+                raise ValueError('line {0}: expected {1} values, got {2}'.format(
+                    number, len(fields), len(value)))
+
+def _from_json_lines(cls, fp, mode='object'):
+    """Read lines of JSON written by _to_json_lines() from fp, a file
+    open in text mode, and yield a record for each one. In object mode,
+    keys that aren't fields are ignored. Blank lines are skipped.
+    Requires Python 3."""
+    _check_json_mode(mode)
+    fields = cls._fields
+    # Return an iterable of the values of each record, from the decoded
+    #  lines.
+    if mode == 'array':
+        rows = lambda values: values
+    elif len(fields) > 1:
+        rows = lambda values: map(_operator.itemgetter(*fields), values)
+    elif fields:
+        rows = lambda values: zip(map(_operator.itemgetter(fields[0]), values))
+    else:
+        rows = lambda values: [()] * len(values)
+    if _positional_constructor(cls):
+        make_many = lambda rows: list(_itertools.starmap(cls, rows))
+    else:
+        make_many = cls._make_many
+
+    first = 1
+    while True:
+        lines = fp.readlines(_JSON_CHUNK_SIZE)
+        if not lines:
+            return
+        values = _decode_json_lines(lines, first)
+        try:
+            with _gc_paused():
+                records = make_many(rows(values))
+        except (KeyError, TypeError):
+            _check_json_values(fields, mode, values, lines, first)
+            raise
+        first += len(lines)
+        for record in records:
+            yield record
+
+
+########################################################################
+# CSV files, read and written with the csv module.
+# The reader converts the strings of each row with a function generated
+#  for the class, and creates the records with _make_many, which stores
+#  each row directly into the new instances' slots. Rows are read a
+#  chunk at a time, but each one is converted as soon as it's read.
+
+_CSV_HEADERS = ('match', 'skip', None)
+_CSV_CHUNK_SIZE = 4096
+
+# The converters for int and float fields.
+_CSV_CONVERTERS = {'int': int, 'float': float}
+
+# Return a list with a converter for each field of cls, or None for a
+#  field whose strings are used unchanged. converters is None, to use
+#  the types of the class, a mapping from field name to converter,
+#  which overrides the types, or a sequence with one for each field.
+def _csv_converters(cls, converters):
+    fields = cls._fields
+    types = getattr(cls, '_types', (None,) * len(fields))
+    by_field = [_CSV_CONVERTERS.get(_value_kind(code)) for code in types]
+    if isinstance(converters, _collections_abc.Mapping):
+        unknown = set(converters) - set(fields)
+        if unknown:
+            raise ValueError('converters given for unknown fields: '
+                             '{0!r}'.format(sorted(unknown)))
+        return [converters.get(field, convert) for field, convert in zip(fields, by_field)]
+    if converters is not None:
+        by_field = list(converters)
+        if len(by_field) != len(fields):
+            raise ValueError('expected {0} converters, got {1}'.format(len(fields),
+                                                                      len(by_field)))
+    return by_field
+
+# _convert0, for the converter of field 0
+def _converter_name(idx):
+    return '_convert{0}'.format(idx)
+
+# Build the function that converts the strings of a row. flags is true
+#  for each field that has a converter:
+#  ts, px, sym = _row
+#  return (_convert0(ts), _convert1(px), sym)
+def _csv_convert_builder(fields, flags):
+    values = [_call(_load(_converter_name(idx)), [_load(field)]) if flag else _load(field)
+              for idx, (field, flag) in enumerate(zip(fields, flags))]
+    body = [_ast.Assign(targets=[_ast.Tuple(elts=[_store(field) for field in fields],
+                                            ctx=_ast.Store())],
+                        value=_load('_row')),
+            _ast.Return(value=_ast.Tuple(elts=values, ctx=_ast.Load()))]
+    return ['_row'], body
+
+def _csv_reader(cls, fp, header='match', converters=None, **fmtparams):
+    """Read fp, a file opened for the csv module, and return an iterator
+    of a record for each row. With header='match', the first row must be
+    the field names. With header='skip', it's skipped, and with
+    header=None, there's no header. converters maps field names to
+    functions that convert the strings read from the file, or is a
+    sequence with one for each field. By default, fields with an integer
+    or floating point type are converted with int() or float(). Blank
+    lines are skipped. Other keyword arguments are passed to
+    csv.reader(). Requires Python 3."""
+    import csv
+    if header not in _CSV_HEADERS:
+        raise ValueError("header must be 'match', 'skip' or None: {0!r}".format(header))
+    converters = _csv_converters(cls, converters)
+    if any(convert is not None for convert in converters):
+        convert = _make_fn('_convert', _csv_convert_builder, cls._fields, [],
+                           dict((_converter_name(idx), convert)
+                                for idx, convert in enumerate(converters)),
+                           tuple(convert is not None for convert in converters))
+    else:
+        convert = None
+    # Iterating over the records of each chunk with chain doesn't
+    #  resume a generator for each record.
+    return _itertools.chain.from_iterable(_csv_chunks(cls, csv.reader(fp, **fmtparams), header,
+                                                      convert))
+
+# Yield a list of the records of each chunk of rows from reader.
+def _csv_chunks(cls, reader, header, convert):
+    fields = cls._fields
+    make_many = getattr(cls, '_make_many', None)
+    if make_many is None:
+        make_many = lambda rows: list(_itertools.starmap(cls, rows))
+    if header is not None:
+        row = next(reader, None)
+        if row is None:
+            return
+        if header == 'match' and tuple(row) != fields:
+            raise ValueError("header {0!r} doesn't match the fields {1!r}".format(row,
+                                                                                list(fields)))
+    while True:
+        line_num = reader.line_num
+        # Blank lines are empty rows.
+        rows = _filter(None, _itertools.islice(reader, _CSV_CHUNK_SIZE))
+        if convert is not None:
+            rows = _map(convert, rows)
+        # Read and convert the rows before pausing garbage collection.
+        try:
+            rows = list(rows)
+        except (ValueError, TypeError, _struct.error) as exc:
+            raise ValueError('line {0}: {1}'.format(reader.line_num, exc))
+        if reader.line_num == line_num:
+            return
+        try:
+            with _gc_paused():
+                records = make_many(rows)
+        except (ValueError, TypeError, _struct.error) as exc:
+            raise ValueError('{0}: {1}'.format(
+                _csv_failed_lines(make_many, rows, line_num, reader.line_num), exc))
+        yield records
+
+# Where the first of rows that make_many rejects ends, for rows read
+#  after line first and up to line last. Each row takes at least one
+#  line, so it's exact unless the rows include blank lines or values
+#  with line breaks. Then it's the range of lines where the row can end.
+def _csv_failed_lines(make_many, rows, first, last):
+    for idx, row in enumerate(rows):
+        try:
+            make_many([row])
+        except (ValueError, TypeError, _struct.error):
+            break
+    low = first + idx + 1
+    high = last - (len(rows) - idx - 1)
+    if low == high:
+        return 'line {0}'.format(low)
+    return 'lines {0}-{1}'.format(low, high)
+
+def _csv_writer(cls, fp, header=True, **fmtparams):
+    """Return a csv.writer for fp, after writing the field names to it
+    if header is true. Pass records to its writerow() and writerows(),
+    which write their values in order. Other keyword arguments are
+    passed to csv.writer(). Requires Python 3."""
+    import csv
+    writer = csv.writer(fp, **fmtparams)
+    if header:
+        writer.writerow(cls._fields)
+    return writer
+
+
+# Enable the code cache from the environment.
+def _init_code_cache():
+    import os
+    path = os.environ.get('NAMEDLIST_CODE_CACHE')
+    if path:
+        try:
+            set_code_cache(path)
+        except ValueError:
+            pass
+
+_init_code_cache()
+
+# Returned by type_cache.info(). The class is created the first time
+#  it's needed, so that importing namedlist doesn't generate any code.
+_CacheInfo = None
+
+def _cache_info(hits, misses, maxsize, currsize):
+    global _CacheInfo
+    if _CacheInfo is None:
+        _CacheInfo = _namedtuple('CacheInfo', 'hits misses maxsize currsize', NO_DEFAULT, False,
+                                 __name__)
+    return _CacheInfo(hits, misses, maxsize, currsize)
@@ -21,10 +21,15 @@
 #
 ########################################################################
 
-from namedlist import namedlist, namedtuple, FACTORY, NO_DEFAULT
+from namedlist import namedlist, namedtuple, namedlist_array, FACTORY, NO_DEFAULT, type_cache
+from namedlist import RecordBatch, SharedRecordTable, codec, make_types, set_code_cache
 
+import io
 import sys
+import json
 import copy
+import array
+import struct
 import unittest
 import collections
 import unicodedata
@@ -47,6 +52,14 @@ except ImportError:
 # types used for pickle tests
 TestNL0 = namedlist('TestNL0', '')
 TestNL = namedlist('TestNL', 'x y z')
+TestTick = namedlist('TestTick', 'ts px qty', default=0, types='q d i', storage='struct')
+TestFrozen = namedlist('TestFrozen', 'x y', frozen=True, cache_hash=True)
+
+class TestNLSub(TestNL):
+    __slots__ = ()
+
+    def __init__(self, x):
+        TestNL.__init__(self, x, 0, 0)
 
 class TestNamedList(unittest.TestCase):
     def test_simple(self):
@@ -184,6 +197,148 @@ class TestNamedList(unittest.TestCase):
         self.assertNotEqual(p0, Point('100'))
         self.assertNotEqual(p0, Point(100, 10, 21))
 
+    def test_equality_semantics(self):
+        Point = namedlist('Point', 'x y')
+        class SubPoint(Point):
+            pass
+        nan = float('nan')
+        p = Point(nan, 1)
+        self.assertEqual(p, p)                          # identity short-circuits
+        self.assertEqual(p, Point(nan, 1))              # like tuples, nan is nan
+        self.assertNotEqual(Point(float('nan'), 1), Point(float('nan'), 1))
+        self.assertTrue(Point.__eq__(Point(1, 2), SubPoint(1, 2)))
+        self.assertFalse(SubPoint.__eq__(SubPoint(1, 2), Point(1, 2)))
+        self.assertNotEqual(Point(1, 2), (1, 2))
+        self.assertNotEqual(Point(1, 2), namedlist('Point', 'x y')(1, 2))
+        self.assertFalse(Point(1, 2) != Point(1, 2))
+        self.assertTrue(Point(1, 2) != Point(1, 3))
+
+        Zero = namedlist('Zero', '')
+        self.assertEqual(Zero(), Zero())
+
+        Tick = namedlist('Tick', 'x y', types='d d', storage='struct')
+        self.assertEqual(Tick(0.0, 1), Tick(-0.0, 1))
+        self.assertNotEqual(Tick(nan, 1), Tick(nan, 1))
+        self.assertNotEqual(Tick(1, 1), Point(1, 1))
+
+    def test_order(self):
+        import heapq
+        Point = namedlist('Point', 'x y', order=True)
+        points = [Point(2, 1), Point(1, 5), Point(1, 2), Point(3, 0)]
+        self.assertEqual(sorted(points), [Point(1, 2), Point(1, 5), Point(2, 1), Point(3, 0)])
+        self.assertEqual(heapq.nsmallest(2, points), [Point(1, 2), Point(1, 5)])
+        self.assertEqual(max(points), Point(3, 0))
+        self.assertTrue(Point(1, 2) <= Point(1, 2))
+        self.assertTrue(Point(1, 2) >= Point(1, 2))
+        self.assertTrue(Point(1, 3) > Point(1, 2))
+        self.assertFalse(Point(1, 3) < Point(1, 2))
+
+        # Only instances of the same class are ordered. Python 2 falls
+        #  back to its default ordering instead of raising TypeError.
+        self.assertIs(Point(1, 2).__lt__((1, 2)), NotImplemented)
+        if _PY3:
+            self.assertRaises(TypeError, lambda: Point(1, 2) < (1, 2))
+            self.assertRaises(TypeError,
+                              lambda: Point(1, 2) < namedlist('Point', 'x y', order=True)(1, 2))
+
+            # Ordering is opt-in.
+            self.assertRaises(TypeError, lambda: namedlist('Point', 'x y')(1, 2) < Point(1, 2))
+
+        Tick = namedlist('Tick', 'ts px', types='q d', storage='struct', order=True)
+        self.assertEqual(sorted([Tick(2, 1.0), Tick(1, 3.0), Tick(1, 2.0)]),
+                         [Tick(1, 2.0), Tick(1, 3.0), Tick(2, 1.0)])
+
+        Zero = namedlist('Zero', '', order=True)
+        self.assertTrue(Zero() <= Zero())
+        self.assertFalse(Zero() < Zero())
+
+    def test_frozen(self):
+        Point = namedlist('Point', 'x y', frozen=True)
+        p = Point(1, 2)
+        self.assertEqual((p.x, p.y), (1, 2))
+        self.assertRaises(AttributeError, setattr, p, 'x', 3)
+        self.assertRaises(AttributeError, setattr, p, 'z', 3)
+        self.assertRaises(AttributeError, delattr, p, 'x')
+        self.assertRaises(TypeError, p.__setitem__, 0, 3)
+        self.assertRaises(AttributeError, p._update, x=3)
+        self.assertEqual(p, Point(1, 2))
+
+        self.assertEqual(hash(p), hash((1, 2)))
+        self.assertEqual(len(set([p, Point(1, 2), Point(2, 1)])), 2)
+        self.assertEqual({p: 'a'}[Point(1, 2)], 'a')
+
+        self.assertEqual(Point._make((3, 4)), Point(3, 4))
+        self.assertEqual(Point._make_many([(3, 4), (5, 6)]), [Point(3, 4), Point(5, 6)])
+        self.assertRaises(ValueError, Point._make, (3,))
+        self.assertEqual(p._replace(y=5), Point(1, 5))
+        self.assertEqual(p, Point(1, 2))
+        self.assertRaises(ValueError, p._replace, z=5)
+        self.assertEqual(copy.copy(p), p)
+        self.assertEqual(copy.deepcopy(p), p)
+
+        Point = namedlist('Point', [('x', FACTORY(list)), ('y', 0)], frozen=True)
+        self.assertEqual(Point(), Point([], 0))
+        self.assertRaises(TypeError, hash, Point())
+
+        # Unlike namedlist, the class with no fields is hashable.
+        Zero = namedlist('Zero', '', frozen=True)
+        self.assertEqual(hash(Zero()), hash(()))
+
+        self.assertRaises(ValueError, namedlist, 'Point', 'x y', frozen=True, use_slots=False)
+        self.assertRaises(ValueError, namedlist, 'Point', 'x y', frozen=True,
+                          types='d d', storage='struct')
+        self.assertRaises(ValueError, namedlist, 'Point', 'x y', cache_hash=True)
+
+    def test_frozen_cache_hash(self):
+        class Value(object):
+            calls = 0
+            def __hash__(self):
+                Value.calls += 1
+                return 1
+        Point = namedlist('Point', 'x y', frozen=True, cache_hash=True)
+        v = Value()
+        p = Point(v, 2)
+        self.assertEqual(hash(p), hash((v, 2)))
+        calls = Value.calls
+        self.assertEqual(hash(p), hash((v, 2)))
+        self.assertEqual(hash(p), hash((v, 2)))
+        self.assertEqual(Value.calls, calls + 2)  # only the tuples were hashed again
+
+        # The cached hash is neither a field nor copied.
+        self.assertEqual(Point._fields, ('x', 'y'))
+        self.assertEqual(list(p), [v, 2])
+        self.assertEqual(p.__getstate__(), (v, 2))
+        self.assertRaises(AttributeError, setattr, p, '_hash', 0)
+        q = pickle.loads(pickle.dumps(TestFrozen(1, 2)))
+        self.assertEqual(q, TestFrozen(1, 2))
+        self.assertEqual(hash(q), hash((1, 2)))
+
+    def test_iteration(self):
+        fields = ['f{0}'.format(i) for i in range(30)]
+        Wide = namedlist('Wide', fields)
+        w = Wide(*range(30))
+        self.assertEqual(list(w), list(range(30)))
+        self.assertEqual(tuple(w), tuple(range(30)))
+        self.assertEqual(w.__getstate__(), tuple(range(30)))
+        w.f3 = 'x'
+        first, second, third, fourth = list(w)[:4]
+        self.assertEqual(fourth, 'x')
+        self.assertEqual(w.index('x'), 3)
+        self.assertEqual(w.count('x'), 1)
+        self.assertEqual(repr(w)[:30], 'Wide(f0=0, f1=1, f2=2, f3=\'x\',')
+
+        # Each call returns a new iterator.
+        it = iter(w)
+        self.assertEqual(next(it), 0)
+        self.assertEqual(next(iter(w)), 0)
+        self.assertEqual(next(it), 1)
+
+        One = namedlist('One', 'a')
+        a, = One(5)
+        self.assertEqual(a, 5)
+        self.assertEqual(One(5).__getstate__(), (5,))
+        self.assertEqual(list(namedlist('Zero', '')()), [])
+
     def test_default_order(self):
         # with no default, can't have a field without a
         #  default follow fields with defaults
@@ -351,6 +506,51 @@ class TestNamedList(unittest.TestCase):
                     self.assertEqual(p._fields, q._fields)
                     self.assertNotIn(b'OrderedDict', module.dumps(p, protocol))
 
+    def test_reduce(self):
+        # Instances pickle as a call to their class with their fields.
+        self.assertEqual(TestNL(1, 2, 3).__reduce__(), (TestNL, (1, 2, 3)))
+        self.assertEqual(TestNL0().__reduce__(), (TestNL0, ()))
+        self.assertEqual(TestFrozen(1, 2).__reduce__(), (TestFrozen, (1, 2)))
+
+        class Sub(TestNL):
+            __slots__ = ()
+        self.assertEqual(Sub(1, 2, 3).__reduce__(), (Sub, (1, 2, 3)))
+        self.assertEqual(pickle.loads(pickle.dumps(TestFrozen(1, 2))), TestFrozen(1, 2))
+
+        p = TestNL(1, [2], 3)
+        self.assertEqual(copy.copy(p), p)
+        self.assertIs(copy.copy(p).y, p.y)
+        self.assertEqual(copy.deepcopy(p), p)
+        self.assertIsNot(copy.deepcopy(p).y, p.y)
+
+        Point = namedlist('Point', 'x y', use_slots=False)
+        self.assertEqual(copy.copy(Point(1, 2)), Point(1, 2))
+
+        # Struct storage pickles its packed bytes instead.
+        self.assertIsInstance(TestTick(1, 2.5, 3).__getstate__(), bytes)
+
+    def test_reduce_subclass_init(self):
+        # Copying and unpickling don't call __init__, which a subclass
+        #  may have overridden with a different signature.
+        p = TestNLSub(1)
+        fn, args = p.__reduce__()
+        self.assertEqual(args, (TestNLSub, (1, 0, 0)))
+        self.assertIs(type(fn(*args)), TestNLSub)
+        for q in (copy.copy(p), copy.deepcopy(p), p._replace(y=5),
+                  pickle.loads(pickle.dumps(p)), pickle.loads(pickle.dumps(p, 2))):
+            self.assertIs(type(q), TestNLSub)
+        self.assertEqual(pickle.loads(pickle.dumps(p)), p)
+        self.assertEqual(list(p._replace(y=5)), [1, 5, 0])
+
+    @unittest.skipIf(sys.version_info < (3,), "'*' requires Python 3")
+    def test_reduce_keyword_only(self):
+        Config = namedlist('Config', 'name * host')
+        c = Config('a', host='h')
+        fn, args = c.__reduce__()
+        self.assertEqual(args, (Config, ('a', 'h')))
+        self.assertEqual(fn(*args), c)
+        self.assertEqual(copy.copy(c), c)
+
     def test_type_has_same_name_as_field(self):
         Point = namedlist('Point',
                            ['Point', ('y', 10), ('z', 20)],
@@ -500,6 +700,67 @@ class TestNamedList(unittest.TestCase):
         self.assertEqual(b.x, [4])
         self.assertEqual(b.y, [])
 
+    def test_factory_only_for_factory_fields(self):
+        # only fields with a FACTORY default call the factory
+        f = FACTORY(list)
+        A = namedlist('A', ['x', ('y', FACTORY(dict))])
+        a = A(f)
+        self.assertIs(a.x, f)
+        self.assertEqual(a.y, {})
+        self.assertIsNot(a.y, A(1).y)
+
+        # an explicitly passed FACTORY is still called for such fields
+        a = A(1, f)
+        self.assertEqual(a.y, [])
+
+    def test_init_without_slots(self):
+        A = namedlist('A', ['x', ('y', FACTORY(list))], use_slots=False)
+        a = A(1)
+        self.assertEqual((a.x, a.y), (1, []))
+        self.assertRaises(TypeError, A)
+        self.assertRaises(TypeError, A, 1, 2, 3)
+
+    def test_same_shape(self):
+        # classes with the same shape share compiled code, but each
+        #  gets its own argument names and defaults
+        A = namedlist('A', 'x y', default=1)
+        B = namedlist('B', 'p q', default=2)
+        self.assertEqual(A.__init__.__code__.co_varnames, ('_self', 'x', 'y'))
+        self.assertEqual(B.__init__.__code__.co_varnames, ('_self', 'p', 'q'))
+        self.assertEqual(list(A()), [1, 1])
+        self.assertEqual(list(B(q=3)), [2, 3])
+        self.assertRaises(TypeError, A, z=3)
+
+        C = namedlist('C', ['x', ('y', FACTORY(list))])
+        self.assertEqual(list(C(1)), [1, []])
+
+    def test_make(self):
+        Point = namedlist('Point', ['x', ('y', FACTORY(list))])
+        p = Point._make([1, 2])
+        self.assertIsInstance(p, Point)
+        self.assertEqual(p, Point(1, 2))
+        self.assertEqual(Point._make(iter('ab')), Point('a', 'b'))
+
+        # _make doesn't call __init__, so a FACTORY is stored as is
+        f = FACTORY(list)
+        self.assertIs(Point._make([1, f]).y, f)
+
+        self.assertRaises(ValueError, Point._make, [1])
+        self.assertRaises(ValueError, Point._make, [1, 2, 3])
+
+        Point = namedlist('Point', '')
+        self.assertEqual(Point._make([]), Point())
+
+        Point = namedlist('Point', 'x y', use_slots=False)
+        self.assertEqual(Point._make((1, 2)), Point(1, 2))
+
+    def test_make_many(self):
+        Point = namedlist('Point', 'x y')
+        points = Point._make_many([(1, 2), [3, 4], iter((5, 6))])
+        self.assertEqual(points, [Point(1, 2), Point(3, 4), Point(5, 6)])
+        self.assertEqual(Point._make_many(iter([])), [])
+        self.assertRaises(ValueError, Point._make_many, [(1, 2), (3,)])
+
     def test_unhashable(self):
         Point = namedlist('Point', 'a b')
         p = Point(1, 2)
@@ -521,6 +782,161 @@ class TestNamedList(unittest.TestCase):
         self.assertEqual(list(p), [10, 20])
         self.assertRaises(IndexError, p.__setitem__, 2, 3)
 
+    @unittest.skipIf(sys.version_info < (3, 8), "'/' requires Python 3.8")
+    def test_positional_only_fields(self):
+        Point = namedlist('Point', 'x y / z', default=0)
+        self.assertEqual(Point(1, 2, 3), Point._make((1, 2, 3)))
+        self.assertEqual(Point(1, 2, z=3), Point(1, 2, 3))
+        self.assertEqual(Point(), Point(0, 0, 0))
+        self.assertRaises(TypeError, Point, x=1)
+        self.assertEqual(Point._fields, ('x', 'y', 'z'))
+        self.assertEqual(Point.__doc__, 'Point(x=0, y=0, /, z=0)')
+
+        Point = namedlist('Point', ['x', '/', ('y', FACTORY(list))])
+        self.assertEqual(Point(1), Point(1, []))
+        self.assertIsNot(Point(1).y, Point(1).y)
+
+        self.assertRaises(ValueError, namedlist, 'Point', '/ x')
+        self.assertRaises(ValueError, namedlist, 'Point', 'x / y /')
+        self.assertRaises(ValueError, namedlist, 'Point', 'x * y / z')
+        self.assertRaises(ValueError, namedtuple, 'Point', 'x / y')
+        self.assertRaises(ValueError, namedlist_array, 'Point', 'x / y')
+
+    @unittest.skipIf(sys.version_info < (3,), "'*' requires Python 3")
+    def test_keyword_only_fields(self):
+        Config = namedlist('Config', ['name', '*', ('retries', 3), 'host', ('tags', FACTORY(list))])
+        c = Config('a', host='h')
+        self.assertEqual(list(c), ['a', 3, 'h', []])
+        self.assertEqual(Config.__doc__, "Config(name, *, retries=3, host, tags=FACTORY(<class 'list'>))"
+                         .replace("<class 'list'>", repr(list)))
+        self.assertIsNot(Config('a', host='h').tags, c.tags)
+        self.assertRaises(TypeError, Config, 'a', 4, 'h')
+        self.assertRaises(TypeError, Config, 'a')
+        self.assertEqual(Config(name='a', host='h', retries=4).retries, 4)
+        self.assertEqual(Config._make(('a', 1, 'h', [])), Config('a', retries=1, host='h'))
+
+        # The default applies to keyword-only fields, too.
+        Config = namedlist('Config', ['name', '*', 'host', ('port', NO_DEFAULT)], default=80)
+        self.assertEqual(Config(), Config(80, host=80, port=80))
+
+        # Keyword-only fields work with the other options.
+        Tick = namedlist('Tick', '* ts px', types='q d', storage='struct', default=0)
+        self.assertEqual(Tick(px=1.5), Tick._make((0, 1.5)))
+        self.assertRaises(TypeError, Tick, 1, 1.5)
+        Frozen = namedlist('Frozen', 'a * b', frozen=True)
+        self.assertEqual(hash(Frozen(1, b=2)), hash((1, 2)))
+
+        # Renaming only counts fields, not markers.
+        Point = namedlist('Point', 'x * def', rename=True)
+        self.assertEqual(Point._fields, ('x', '_1'))
+
+        self.assertRaises(ValueError, namedlist, 'Point', 'x *')
+        self.assertRaises(ValueError, namedlist, 'Point', 'x * y * z')
+        self.assertRaises(ValueError, namedtuple, 'Point', 'x * y')
+
+    def test_slice_assignment(self):
+        Row = namedlist('Row', 'a b c d e')
+        r = Row(1, 2, 3, 4, 5)
+        r[1:3] = (20, 30)
+        self.assertEqual(list(r), [1, 20, 30, 4, 5])
+        r[::2] = iter([10, 300, 50])
+        self.assertEqual(list(r), [10, 20, 300, 4, 50])
+        r[-2:] = [40, 500]
+        self.assertEqual(list(r), [10, 20, 300, 40, 500])
+        r[5:] = []
+        self.assertEqual(list(r), [10, 20, 300, 40, 500])
+
+        # The number of fields is fixed, and nothing is set on an error.
+        self.assertRaises(ValueError, r.__setitem__, slice(1, 3), (0,))
+        self.assertRaises(ValueError, r.__setitem__, slice(1, 3), (0, 0, 0))
+        self.assertRaises(TypeError, r.__setitem__, slice(1, 3), 0)
+        self.assertEqual(list(r), [10, 20, 300, 40, 500])
+
+    def test_set_many(self):
+        Row = namedlist('Row', 'a b c d e')
+        r = Row(1, 2, 3, 4, 5)
+        r._set_many(1, (20, 30))
+        self.assertEqual(list(r), [1, 20, 30, 4, 5])
+        r._set_many(0, iter(range(5)))
+        self.assertEqual(list(r), [0, 1, 2, 3, 4])
+        r._set_many(-2, [30, 40])
+        self.assertEqual(list(r), [0, 1, 2, 30, 40])
+        r._set_many(5, [])
+        self.assertEqual(list(r), [0, 1, 2, 30, 40])
+
+        self.assertRaises(ValueError, r._set_many, 3, (1, 2, 3))
+        self.assertRaises(IndexError, r._set_many, 6, ())
+        self.assertRaises(IndexError, r._set_many, -6, (1,))
+        self.assertEqual(list(r), [0, 1, 2, 30, 40])
+
+        Tick = namedlist('Tick', 'ts px qty', types='q d i', storage='struct')
+        t = Tick(1, 2.5, 3)
+        t._set_many(1, (3.5, 4))
+        t[:2] = (5, 6.5)
+        self.assertEqual(t, Tick(5, 6.5, 4))
+
+        Frozen = namedlist('Frozen', 'a b', frozen=True)
+        f = Frozen(1, 2)
+        self.assertRaises(TypeError, f.__setitem__, slice(None), (3, 4))
+        self.assertRaises(AttributeError, f._set_many, 0, (3, 4))
+        self.assertEqual(f, Frozen(1, 2))
+
+    def test_positional_access(self):
+        for Point in (namedlist('Point', 'a b c'),
+                      namedlist('Point', 'a b c', use_slots=False),
+                      namedlist('Point', 'a b c', types='i i i', storage='struct')):
+            p = Point(1, 2, 3)
+            values = [1, 2, 3]
+            for idx in range(-4, 4):
+                if -3 <= idx < 3:
+                    self.assertEqual(p[idx], values[idx])
+                else:
+                    self.assertRaises(IndexError, p.__getitem__, idx)
+                    self.assertRaises(IndexError, p.__setitem__, idx, 0)
+            for idx in (slice(None), slice(1, None), slice(None, -1), slice(None, None, -1),
+                        slice(0, 3, 2), slice(5, 10), slice(2, 1)):
+                self.assertEqual(p[idx], values[idx])
+            p[-1] = 30
+            p[0] = 10
+            self.assertEqual(list(p), [10, 2, 30])
+            self.assertRaises(TypeError, p.__getitem__, 'a')
+            self.assertRaises(TypeError, p.__setitem__, 'a', 0)
+
+        p = namedlist('Point', 'a b')(1, 2)
+        try:
+            p[2]
+        except IndexError as e:
+            self.assertEqual(str(e), 'list index out of range')
+        try:
+            p[2] = 0
+        except IndexError as e:
+            self.assertEqual(str(e), 'list assignment index out of range')
+
+    def test_positional_assignment_setter_error(self):
+        # Errors raised by a field's setter aren't mistaken for a slice
+        #  or an index out of range.
+        class Point(namedlist('Point', 'a b')):
+            __slots__ = ()
+
+            def __setattr__(self, name, value):
+                if value is None:
+                    raise TypeError('no None')
+                if value < 0:
+                    raise IndexError('no negatives')
+                super(Point, self).__setattr__(name, value)
+
+        p = Point(1, 2)
+        for value, exc, message in ((None, TypeError, 'no None'),
+                                    (-1, IndexError, 'no negatives')):
+            try:
+                p[1] = value
+            except exc as e:
+                self.assertEqual(str(e), message)
+            else:
+                self.fail('{0} not raised'.format(exc.__name__))
+        p[0:2] = [3, 4]
+        self.assertEqual(list(p), [3, 4])
+
     def test_container(self):
         # I'm not sure there's much sense in this, but list is a container
         Point = namedlist('Point', 'a b')
@@ -744,6 +1160,15 @@ class TestNamedTuple(unittest.TestCase):
         self.assertEqual(b2, tuple(b2_expected))
         self.assertEqual(b._fields, tuple(names))
 
+    def test_factory_defaults(self):
+        Point = namedtuple('Point', ['x', ('y', FACTORY(list))])
+        p = Point(1)
+        self.assertEqual(p, (1, []))
+        self.assertIsNot(p.y, Point(1).y)
+        self.assertEqual(Point(1, 2), (1, 2))
+        self.assertRaises(TypeError, Point)
+        self.assertRaises(TypeError, Point, 1, 2, 3)
+
     def test_pickle(self):
         p = TestNT(x=10, y=20, z=30)
         for module in (pickle,):
@@ -781,6 +1206,765 @@ class TestNamedTuple(unittest.TestCase):
         self.assertEqual(repr(B(1)), 'B(x=1)')
 
 
+class TestStructStorage(unittest.TestCase):
+    def test_fields(self):
+        t = TestTick(1, 2.5, 3)
+        self.assertEqual((t.ts, t.px, t.qty), (1, 2.5, 3))
+        self.assertEqual(TestTick._types, ('q', 'd', 'i'))
+        self.assertEqual(TestTick.__slots__, ('_buf', '_offset'))
+        self.assertEqual(t.__getstate__(), struct.pack('<qdi', 1, 2.5, 3))
+        if _PY3:
+            self.assertEqual(bytes(t), t.__getstate__())
+        self.assertEqual(list(t), [1, 2.5, 3])
+        self.assertEqual(t._asdict(), {'ts': 1, 'px': 2.5, 'qty': 3})
+        self.assertEqual(repr(t), 'TestTick(ts=1, px=2.5, qty=3)')
+        self.assertEqual(TestTick(), TestTick(0, 0.0, 0))
+        self.assertRaises(TypeError, hash, t)
+
+    def test_write(self):
+        t = TestTick(1, 2.5, 3)
+        t.px = 4.5
+        t[2] = 7
+        t._update(ts=9)
+        self.assertEqual(list(t), [9, 4.5, 7])
+        self.assertEqual(t.__getstate__(), struct.pack('<qdi', 9, 4.5, 7))
+        self.assertRaises(struct.error, setattr, t, 'ts', 'a')
+        self.assertEqual(t.ts, 9)
+
+        u = t._replace(qty=1)
+        self.assertEqual(list(u), [9, 4.5, 1])
+        self.assertEqual(list(t), [9, 4.5, 7])
+
+    def test_make(self):
+        self.assertEqual(TestTick._make([1, 2.0, 3]), TestTick(1, 2.0, 3))
+        self.assertEqual(TestTick._make_many([(1, 2.0, 3), (4, 5.0, 6)]),
+                         [TestTick(1, 2.0, 3), TestTick(4, 5.0, 6)])
+        self.assertRaises(ValueError, TestTick._make, [1, 2.0])
+
+        data = struct.pack('<qdi', 1, 2.5, 3)
+        t = TestTick._frombytes(data)
+        self.assertEqual(t, TestTick(1, 2.5, 3))
+        self.assertRaises(ValueError, TestTick._frombytes, data[1:])
+
+    def test_pickle_and_copy(self):
+        t = TestTick(1, 2.5, 3)
+        for module in pickle_modules:
+            for protocol in range(module.HIGHEST_PROTOCOL + 1):
+                self.assertEqual(module.loads(module.dumps(t, protocol)), t)
+        for copier in copy.copy, copy.deepcopy:
+            u = copier(t)
+            self.assertEqual(u, t)
+            u.ts = 10
+            self.assertEqual(t.ts, 1)
+
+    def test_views(self):
+        data = struct.pack('<qdi', 1, 2.5, 3) + struct.pack('<qdi', 4, 5.5, 6)
+        for buf in (data, bytearray(data), memoryview(bytearray(data))):
+            self.assertEqual(TestTick._at(buf, 1), TestTick(4, 5.5, 6))
+            self.assertEqual(TestTick._at(buf, -2), TestTick(1, 2.5, 3))
+            self.assertEqual(TestTick._at(b'xx' + data, 1, offset=2), TestTick(4, 5.5, 6))
+            self.assertRaises(IndexError, TestTick._at, buf, 2)
+            self.assertRaises(IndexError, TestTick._at, buf, -3)
+            self.assertRaises(IndexError, TestTick._at, buf, 1, offset=1)
+        self.assertRaises(TypeError, setattr, TestTick._at(data, 0), 'ts', 10)
+
+        # writing to a view writes to the buffer
+        buf = bytearray(data)
+        t = TestTick._at(buf, 1)
+        t.qty = 60
+        self.assertEqual(buf[20:], struct.pack('<qdi', 4, 5.5, 60))
+        self.assertEqual(buf[:20], data[:20])
+
+        # copies of a view own their own buffer
+        u = copy.copy(t)
+        u.qty = 0
+        self.assertEqual(t.qty, 60)
+        self.assertEqual(t.__getstate__(), struct.pack('<qdi', 4, 5.5, 60))
+        self.assertEqual(pickle.loads(pickle.dumps(t)), t)
+
+    def test_mmap_view(self):
+        import mmap
+        import tempfile
+        with tempfile.TemporaryFile() as f:
+            f.write(struct.pack('<qdi', 1, 2.5, 3) * 4)
+            f.flush()
+            m = mmap.mmap(f.fileno(), 0)
+            try:
+                t = TestTick._at(m, 3)
+                self.assertEqual(t, TestTick(1, 2.5, 3))
+                t.px = 7.5
+                self.assertEqual(TestTick._at(m, 3).px, 7.5)
+                self.assertEqual(TestTick._at(m, 2).px, 2.5)
+                del t
+            finally:
+                m.close()
+
+    def test_record_file(self):
+        import os
+        import tempfile
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            records = [TestTick(1, 2.5, 3), (4, 5.5, 6), TestTick._at(TestTick(7, 8.5, 9).__getstate__())]
+            self.assertEqual(TestTick._dump_file(path, iter(records)), 3)
+
+            with TestTick._open_file(path) as f:
+                self.assertEqual(len(f), 3)
+                self.assertEqual(f[1], TestTick(4, 5.5, 6))
+                self.assertEqual(f[-1], TestTick(7, 8.5, 9))
+                self.assertEqual(list(f), [TestTick(1, 2.5, 3), TestTick(4, 5.5, 6),
+                                           TestTick(7, 8.5, 9)])
+                self.assertEqual(list(f[::2]), [TestTick(1, 2.5, 3), TestTick(7, 8.5, 9)])
+                self.assertEqual(len(f[5:]), 0)
+                self.assertEqual(f[1:][-1].qty, 9)
+                self.assertEqual(f.index(TestTick(4, 5.5, 6)), 1)
+                self.assertIsInstance(f, collections_abc.Sequence)
+                self.assertRaises(IndexError, f.__getitem__, 3)
+                self.assertRaises(TypeError, setattr, f[0], 'ts', 10)
+
+            with TestTick._open_file(path, writable=True) as f:
+                f[0].ts = 10
+            with TestTick._open_file(path) as f:
+                self.assertEqual(f[0].ts, 10)
+
+            Other = namedlist('Other', 'ts px qty', types='q d q', storage='struct')
+            self.assertRaises(ValueError, Other._open_file, path)
+
+            TestTick._dump_file(path, [])
+            with TestTick._open_file(path) as f:
+                self.assertEqual(len(f), 0)
+
+            with open(path, 'wb') as f:
+                f.write(b'not a record file')
+            self.assertRaises(ValueError, TestTick._open_file, path)
+        finally:
+            os.remove(path)
+
+    @unittest.skipIf(sys.version_info < (3, 8), 'requires multiprocessing.shared_memory')
+    def test_shared_record_table(self):
+        table = SharedRecordTable.from_records(TestTick, [TestTick(1, 2.5, 3), (4, 5.5, 6)])
+        try:
+            self.assertEqual(list(table), [TestTick(1, 2.5, 3), TestTick(4, 5.5, 6)])
+            table[0] = (7, 8.5, 9)
+            self.assertRaises(struct.error, table.__setitem__, 0, (7, 8.5, 'a'))
+            self.assertEqual(table[0], TestTick(7, 8.5, 9))
+
+            # pickling only sends the name and the range of records
+            data = pickle.dumps(table[1:])
+            self.assertLess(len(data), 200)
+            with pickle.loads(data) as other:
+                self.assertEqual(other.name, table.name)
+                self.assertEqual(list(other), [TestTick(4, 5.5, 6)])
+                other[0].qty = 60
+            self.assertEqual(table[1].qty, 60)
+
+            with SharedRecordTable.attach(TestTick, table.name) as other:
+                self.assertEqual(len(other), 2)
+            Other = namedlist('Other', 'ts px qty', types='q d q', storage='struct')
+            self.assertRaises(ValueError, SharedRecordTable.attach, Other, table.name)
+        finally:
+            table.close()
+            table.unlink()
+
+        with SharedRecordTable.create(TestTick, 3) as table:
+            self.assertEqual(list(table), [TestTick()] * 3)
+            table.unlink()
+
+    def test_factory_and_bytes_fields(self):
+        A = namedlist('A', ['name', ('n', FACTORY(int))], types='4s h', storage='struct',
+                      use_slots=False)
+        a = A(b'ab')
+        self.assertEqual((a.name, a.n), (b'ab\0\0', 0))
+
+    def test_bad_storage(self):
+        self.assertRaises(ValueError, namedlist, 'A', 'x y', types='d', storage='struct')
+        self.assertRaises(ValueError, namedlist, 'A', 'x y', types=['d', None], storage='struct')
+        self.assertRaises(ValueError, namedlist, 'A', 'x y', storage='struct')
+        self.assertRaises(ValueError, namedlist, 'A', 'x y', types='d d', storage='array')
+
+
+class TestNamedListArray(unittest.TestCase):
+    def test_columns(self):
+        Points = namedlist_array('Point', 'x y tag', types={'x': 'd', 'y': 'q'})
+        self.assertEqual(Points.__name__, 'PointArray')
+        self.assertEqual(Points._types, ('d', 'q', None))
+
+        points = Points([(1, 2, 'a'), (3, 4, 'b')])
+        points.append(5, 6, tag='c')
+        self.assertEqual(len(points), 3)
+        self.assertIsInstance(points._column('x'), array.array)
+        self.assertEqual(points._column('x').typecode, 'd')
+        self.assertEqual(list(points._column('y')), [2, 4, 6])
+        self.assertEqual(points._column('tag'), ['a', 'b', 'c'])
+        self.assertRaises(KeyError, points._column, 'z')
+
+    def test_rows(self):
+        Points = namedlist_array('Point', 'x y', types='d d')
+        points = Points([(1, 2), (3, 4)])
+        row = points[-1]
+        self.assertEqual(row._fields, ('x', 'y'))
+        self.assertEqual((row.x, row.y), (3.0, 4.0))
+        self.assertEqual(list(row), [3.0, 4.0])
+        self.assertEqual(row._asdict(), {'x': 3.0, 'y': 4.0})
+        self.assertEqual(repr(row), 'Point(x=3.0, y=4.0)')
+        self.assertEqual(row[1], 4.0)
+        self.assertEqual(row, points[1])
+        self.assertNotEqual(row, points[0])
+        self.assertRaises(IndexError, points.__getitem__, 2)
+        self.assertRaises(TypeError, hash, row)
+
+        # rows are views, writing to them writes to the columns
+        row.x = 10
+        row[1] = 20
+        self.assertEqual(list(points._column('x')), [1.0, 10.0])
+        self.assertEqual(list(points._column('y')), [2.0, 20.0])
+
+        points[0] = (5, 6)
+        self.assertEqual([tuple(r) for r in points], [(5.0, 6.0), (10.0, 20.0)])
+        self.assertEqual([tuple(r) for r in points[1:]], [(10.0, 20.0)])
+
+    def test_defaults(self):
+        Points = namedlist_array('Point', ['x', ('y', 0), ('z', FACTORY(list))])
+        points = Points()
+        points.append(1)
+        points.append(2, 3)
+        self.assertEqual([tuple(r) for r in points], [(1, 0, []), (2, 3, [])])
+        self.assertIsNot(points[0].z, points[1].z)
+        self.assertRaises(TypeError, points.append)
+
+    def test_errors_keep_columns_aligned(self):
+        # 'i', since Python 2 stores 'q' columns in lists, which take any value.
+        Points = namedlist_array('Point', 'x y', types='i i')
+        points = Points([(1, 2)])
+        self.assertRaises(TypeError, points.append, 3, 'a')
+        self.assertRaises(TypeError, points.extend, [(3, 4), (5, 'a')])
+        self.assertRaises(ValueError, points.extend, [(3, 4), (5,)])
+        self.assertRaises(TypeError, points.__setitem__, 0, (3, 'a'))
+        self.assertRaises(ValueError, points.__setitem__, 0, (3,))
+        self.assertEqual([tuple(r) for r in points], [(1, 2)])
+        self.assertEqual([len(c) for c in points._columns], [1, 1])
+
+    def test_bad_types(self):
+        self.assertRaises(ValueError, namedlist_array, 'Point', 'x y', types='d')
+        self.assertRaises(ValueError, namedlist_array, 'Point', 'x y', types='d dd')
+        self.assertRaises(ValueError, namedlist_array, 'Point', 'x y', types={'z': 'd'})
+        self.assertRaises(ValueError, namedlist_array, 'Point', 'x', types=['Z'])
+        self.assertRaises(ValueError, namedlist_array, 'Point', '')
+
+
+class TestRecordBatch(unittest.TestCase):
+    def test_list(self):
+        batch = RecordBatch(TestNL, [TestNL(1, 2, 3)])
+        batch.append(TestNL(4, 5, 6))
+        self.assertIsInstance(batch, list)
+        self.assertEqual(batch, [TestNL(1, 2, 3), TestNL(4, 5, 6)])
+        self.assertIs(batch.record_type, TestNL)
+        self.assertEqual(batch._columns(), [[1, 4], [2, 5], [3, 6]])
+        self.assertEqual(repr(RecordBatch(TestNL0, [TestNL0()])), 'RecordBatch(TestNL0, [TestNL0()])')
+        self.assertRaises(AttributeError, setattr, batch, 'x', 1)
+
+    def test_pickle(self):
+        for cls, records in ((TestNL, [TestNL(idx, str(idx), [idx]) for idx in range(10)]),
+                             (TestTick, [TestTick(idx, idx / 2.0, 3) for idx in range(10)]),
+                             (TestFrozen, [TestFrozen(1, 2), TestFrozen(3, 4)]),
+                             (TestNL0, [TestNL0(), TestNL0()]),
+                             (TestNL, [])):
+            batch = RecordBatch(cls, records)
+            for module in pickle_modules:
+                for protocol in range(-1, module.HIGHEST_PROTOCOL + 1):
+                    other = module.loads(module.dumps(batch, protocol))
+                    self.assertIsInstance(other, RecordBatch)
+                    self.assertIs(other.record_type, cls)
+                    self.assertEqual(other, records)
+                    self.assertEqual([type(record) for record in other], [cls] * len(records))
+
+        # The class is only pickled once.
+        data = pickle.dumps(RecordBatch(TestNL, [TestNL(1, 2, 3)] * 100), 2)
+        self.assertEqual(data.count(b'TestNL'), 1)
+
+    def test_gc_restored(self):
+        import gc
+        batch = RecordBatch(TestNL, [TestNL(1, 2, 3)])
+        self.assertTrue(gc.isenabled())
+        pickle.loads(pickle.dumps(batch))
+        self.assertTrue(gc.isenabled())
+        gc.disable()
+        try:
+            pickle.loads(pickle.dumps(batch))
+            self.assertFalse(gc.isenabled())
+        finally:
+            gc.enable()
+
+        # Also if the columns are the wrong length for the class.
+        make_record_batch = batch.__reduce__()[0]
+        self.assertRaises(ValueError, make_record_batch, TestNL, 1, [[1], [2]])
+        self.assertTrue(gc.isenabled())
+
+
+# A file object which returns at most 7 bytes from each read, like a
+#  socket.
+class _SlowReader(object):
+    def __init__(self, data):
+        self._f = io.BytesIO(data)
+
+    def read(self, size):
+        return self._f.read(min(size, 7))
+
+class TestCodec(unittest.TestCase):
+    def round_trip(self, cls, records, types=None):
+        f = io.BytesIO()
+        count = codec(cls, types).dump(records, f)
+        loaded = list(codec(cls, types).load(io.BytesIO(f.getvalue())))
+        self.assertEqual(list(codec(cls, types).load(_SlowReader(f.getvalue()))), loaded)
+        self.assertEqual(len(loaded), count)
+        self.assertEqual([type(record) for record in loaded], [cls] * count)
+        return loaded, f.getvalue()
+
+    def test_round_trip(self):
+        Msg = namedlist('Msg', 'id px text data', types='q d str bytes')
+        records = [Msg(1, 2.5, u'caf\xe9', b'\xff\x00'), Msg(-1, 0.0, u'', b''),
+                   Msg(2, 1.0, u'a\x00b', b'a')]
+        self.assertEqual(self.round_trip(Msg, records)[0], records)
+        self.assertEqual(self.round_trip(Msg, records[:1])[0], records[:1])
+        self.assertEqual(self.round_trip(Msg, [])[0], [])
+
+        # Records can be any sequences of values.
+        self.assertEqual(self.round_trip(Msg, [tuple(record) for record in records])[0], records)
+
+        # Many blocks, from an iterator.
+        records = [Msg(idx, idx / 2.0, str(idx), b'x' * (idx % 3)) for idx in range(10000)]
+        self.assertEqual(self.round_trip(Msg, iter(records))[0], records)
+
+        # Struct storage uses the types of the class.
+        self.assertEqual(self.round_trip(TestTick, [TestTick(1, 2.5, 3)])[0], [TestTick(1, 2.5, 3)])
+        self.assertEqual(repr(codec(TestTick)), "codec(TestTick, 'q d i')")
+
+        # Other classes need types.
+        Pair = namedtuple('Pair', 'a name')
+        self.assertEqual(self.round_trip(Pair, [Pair(1, u'x')], 'h str')[0], [Pair(1, u'x')])
+        self.assertEqual(self.round_trip(TestNL, [TestNL(1, 2, 3)], {'x': 'b', 'y': 'b', 'z': 'b'})[0],
+                         [TestNL(1, 2, 3)])
+
+    @unittest.skipIf(sys.version_info < (3,), "'*' requires Python 3")
+    def test_keyword_only(self):
+        Config = namedlist('Config', 'name * port', types='str H')
+        self.assertEqual(self.round_trip(Config, [Config('a', port=80)])[0], [Config('a', port=80)])
+
+    def test_errors(self):
+        self.assertRaises(ValueError, codec, TestNL)
+        self.assertRaises(ValueError, codec, TestNL, 'i i')
+        self.assertRaises(ValueError, codec, TestNL0)
+        self.assertRaises(ValueError, codec, namedlist('Point', 'x y', types={'x': 'd'}))
+        self.assertRaises(ValueError, namedlist, 'Point', 'x name', types='d str', storage='struct')
+
+        Point = namedlist('Point', 'x y', types='d str')
+        self.assertRaises(ValueError, codec(Point).dump, [(1.0, u'a'), (2.0,)], io.BytesIO())
+        self.assertRaises(ValueError, codec(Point).dump, [(1.0, u'a', 3)], io.BytesIO())
+
+        f = io.BytesIO()
+        codec(Point).dump([Point(1.0, u'a')], f)
+        data = f.getvalue()
+        self.assertRaises(ValueError, list, codec(Point, 'd bytes').load(io.BytesIO(data)))
+        self.assertRaises(ValueError, list, codec(Point).load(io.BytesIO(b'x' + data)))
+        self.assertRaises(ValueError, list, codec(Point).load(io.BytesIO(data[:-1])))
+        self.assertRaises(ValueError, list, codec(Point).load(io.BytesIO(data[:5])))
+
+
+@unittest.skipIf(sys.version_info < (3,), 'requires Python 3')
+class TestJsonLines(unittest.TestCase):
+    def round_trip(self, cls, records, mode='object'):
+        f = io.StringIO()
+        count = cls._to_json_lines(records, f, mode)
+        self.assertEqual(f.getvalue().count(u'\n'), count)
+        loaded = list(cls._from_json_lines(io.StringIO(f.getvalue()), mode))
+        self.assertEqual([type(record) for record in loaded], [cls] * count)
+        return loaded, f.getvalue()
+
+    def test_object(self):
+        Msg = namedlist('Msg', 'id px qty text extra',
+                        types={'id': 'q', 'px': 'd', 'qty': 'i', 'text': 'str'})
+        records = [Msg(1, 2.5, 3, u'caf\xe9 "q"\n', [1, None]), Msg(-1, 1e100, 0, u'', {'a': True})]
+        loaded, data = self.round_trip(Msg, records)
+        self.assertEqual(loaded, records)
+        self.assertEqual(data.splitlines()[0],
+                         u'{"id":1,"px":2.5,"qty":3,"text":"caf\\u00e9 \\"q\\"\\n","extra":[1,null]}')
+        self.assertEqual([json.loads(line) for line in data.splitlines()],
+                         [record._asdict() for record in records])
+
+        # Not finite floats are written as the json module writes them.
+        loaded, data = self.round_trip(Msg, [Msg(1, float('inf'), 1, u'', 1)])
+        self.assertIn(u'"px":Infinity', data)
+        self.assertEqual(loaded[0].px, float('inf'))
+
+        # Values that aren't of the field's type are written by the json
+        #  module too.
+        records = [Msg(True, 2, None, None, 1), Msg(False, None, 2.5, 3, 1)]
+        loaded, data = self.round_trip(Msg, records)
+        self.assertEqual(loaded, records)
+        self.assertEqual(data.splitlines()[0],
+                         u'{"id":true,"px":2,"qty":null,"text":null,"extra":1}')
+
+        # Many chunks, from an iterator. Blank lines and unknown keys are
+        #  ignored.
+        records = [Msg(idx, idx / 2.0, idx, str(idx), None) for idx in range(10000)]
+        self.assertEqual(self.round_trip(Msg, iter(records))[0], records)
+        lines = u'\n{"id":1,"px":2,"qty":3,"text":"","extra":4,"other":5}\n  \n'
+        self.assertEqual(list(Msg._from_json_lines(io.StringIO(lines))), [Msg(1, 2, 3, u'', 4)])
+
+        # namedtuple, and classes without types.
+        Pair = namedtuple('Pair', 'a b')
+        self.assertEqual(self.round_trip(Pair, [Pair(1, u'x'), Pair(None, 2.5)])[0],
+                         [Pair(1, u'x'), Pair(None, 2.5)])
+        self.assertEqual(self.round_trip(TestNL0, [TestNL0()])[0], [TestNL0()])
+        One = namedlist('One', 'a')
+        self.assertEqual(self.round_trip(One, [One(1), One(2)])[0], [One(1), One(2)])
+
+    def test_array(self):
+        records = [TestNL(1, u'a', [2.5]), TestNL(None, True, {})]
+        loaded, data = self.round_trip(TestNL, records, 'array')
+        self.assertEqual(loaded, records)
+        self.assertEqual(data, u'[1,"a",[2.5]]\n[null,true,{}]\n')
+        self.assertEqual(self.round_trip(TestTick, [TestTick(1, 2.5, 3)], 'array')[0],
+                         [TestTick(1, 2.5, 3)])
+
+    @unittest.skipIf(sys.version_info < (3,), "'*' requires Python 3")
+    def test_keyword_only(self):
+        Config = namedlist('Config', 'name * port')
+        for mode in ('object', 'array'):
+            self.assertEqual(self.round_trip(Config, [Config('a', port=80)], mode)[0],
+                             [Config('a', port=80)])
+
+    def test_errors(self):
+        self.assertRaises(ValueError, TestNL._to_json_lines, [], io.StringIO(), 'csv')
+        self.assertRaises(ValueError, list, TestNL._from_json_lines(io.StringIO(), 'csv'))
+
+        def error(lines, mode='object'):
+            try:
+                list(TestNL._from_json_lines(io.StringIO(lines), mode))
+            except ValueError as exc:
+                return str(exc)
+            self.fail('no error')
+
+        good = u'{"x":1,"y":2,"z":3}\n'
+        self.assertTrue(error(good + u'\n{"x":1,\n').startswith('line 3: '))
+        self.assertEqual(error(good + u'{"x":1}\n'), "line 2: missing fields ['y', 'z']")
+        self.assertEqual(error(good + u'[1,2,3]\n'), 'line 2: expected an object, got [1, 2, 3]')
+        self.assertEqual(error(u'[1,2,3]\n[1,2]\n', 'array'), 'line 2: expected 3 values, got 2')
+        self.assertEqual(error(u'[1,2,3]\n5\n', 'array'), 'line 2: expected an array, got 5')
+        self.assertRaises(ValueError, list, TestNL._from_json_lines(io.StringIO(u'[1,2,3] [4,5,6]\n'),
+                                                                    'array'))
+        # Each value must be on one line.
+        self.assertTrue(error(u'[1,2,3]\n[1,\n2,3]\n', 'array').startswith('line 2: '))
+
+
+@unittest.skipIf(sys.version_info < (3,), 'requires Python 3')
+class TestCsv(unittest.TestCase):
+    def test_round_trip(self):
+        Trade = namedlist('Trade', 'ts px qty sym note',
+                          types={'ts': 'q', 'px': 'd', 'qty': 'i', 'sym': 'str'})
+        records = [Trade(1, 2.5, 3, 'a,b', 'x'), Trade(-2, 1e100, 0, '', 'line\nbreak')]
+        f = io.StringIO(newline=u'')
+        Trade._csv_writer(f).writerows(records)
+        self.assertEqual(f.getvalue().splitlines()[:2], ['ts,px,qty,sym,note', '1,2.5,3,"a,b",x'])
+        self.assertEqual(list(Trade._csv_reader(io.StringIO(f.getvalue(), newline=u''))), records)
+
+        # Many chunks, and blank lines.
+        records = [Trade(idx, idx / 2.0, idx, str(idx), '') for idx in range(10000)]
+        f = io.StringIO(newline=u'')
+        Trade._csv_writer(f, header=False).writerows(records)
+        data = f.getvalue().replace('\r\n', '\n').replace('\n', '\n\n', 5000)
+        self.assertEqual(list(Trade._csv_reader(io.StringIO(data), header=None)), records)
+
+    def test_header(self):
+        data = u'x,y,z\n1,2,3\n'
+        self.assertEqual(list(TestNL._csv_reader(io.StringIO(data))), [TestNL('1', '2', '3')])
+        self.assertEqual(list(TestNL._csv_reader(io.StringIO(u'a,b,c\n1,2,3\n'), header='skip')),
+                         [TestNL('1', '2', '3')])
+        self.assertEqual(list(TestNL._csv_reader(io.StringIO(data), header=None)),
+                         [TestNL('x', 'y', 'z'), TestNL('1', '2', '3')])
+        self.assertEqual(list(TestNL._csv_reader(io.StringIO(u''))), [])
+        self.assertRaises(ValueError, list, TestNL._csv_reader(io.StringIO(u'x,z,y\n1,2,3\n')))
+        self.assertRaises(ValueError, TestNL._csv_reader, io.StringIO(data), header='first')
+
+    def test_converters(self):
+        data = u'x,y,z\n1,2,3\n'
+        self.assertEqual(list(TestNL._csv_reader(io.StringIO(data), converters={'y': int})),
+                         [TestNL('1', 2, '3')])
+        self.assertEqual(list(TestNL._csv_reader(io.StringIO(data),
+                                                 converters=[float, None, int])),
+                         [TestNL(1.0, '2', 3)])
+        self.assertEqual(list(TestTick._csv_reader(io.StringIO(u'ts,px,qty\n1,2.5,3\n'))),
+                         [TestTick(1, 2.5, 3)])
+        self.assertRaises(ValueError, list, TestTick._csv_reader(io.StringIO(u'ts,px,qty\n1,2.5,3\n'),
+                                                                 converters={'px': None}))
+        self.assertRaises(ValueError, TestNL._csv_reader, io.StringIO(data), converters={'w': int})
+        self.assertRaises(ValueError, TestNL._csv_reader, io.StringIO(data), converters=[int])
+
+        Pair = namedtuple('Pair', 'a b')
+        self.assertEqual(list(Pair._csv_reader(io.StringIO(u'1,x\n'), header=None,
+                                               converters=[int, None])), [Pair(1, 'x')])
+        self.assertRaises(ValueError, list, Pair._csv_reader(io.StringIO(u'1,x,2\n'), header=None))
+
+    @unittest.skipIf(sys.version_info < (3,), "'*' requires Python 3")
+    def test_keyword_only(self):
+        Config = namedlist('Config', 'name * port', types={'port': 'H'})
+        self.assertEqual(list(Config._csv_reader(io.StringIO(u'name,port\na,80\n'))),
+                         [Config('a', port=80)])
+
+    def test_errors(self):
+        def error(data):
+            try:
+                list(TestTick._csv_reader(io.StringIO(data)))
+            except ValueError as exc:
+                return str(exc)
+            self.fail('no error')
+
+        self.assertTrue(error(u'ts,px,qty\n1,2,3\n\n1,x,3\n').startswith('line 4: '))
+        self.assertTrue(error(u'ts,px,qty\n1,2,3\n1,2\n').startswith('line 3: '))
+        self.assertTrue(error(u'ts,px,qty\n1,2,3\n1,2,3,4\n').startswith('line 3: '))
+
+        # Without converters, the rows are checked when the records are
+        #  created, after the whole chunk has been read.
+        def make_error(data):
+            try:
+                list(TestNL._csv_reader(io.StringIO(data)))
+            except ValueError as exc:
+                return str(exc)
+            self.fail('no error')
+
+        self.assertTrue(make_error(u'x,y,z\n1,2,3\n1,2\n1,2,3\n').startswith('line 3: '))
+        self.assertTrue(make_error(u'x,y,z\n1,2,3\n\n1,2\n1,2,3\n').startswith('lines 3-4: '))
+
+
+class TestTypeCache(unittest.TestCase):
+    def setUp(self):
+        type_cache.resize(2)
+        type_cache.clear()
+
+    def tearDown(self):
+        type_cache.resize(0)
+        type_cache.clear()
+
+    def test_hit(self):
+        A = namedlist('A', 'x y', default=0)
+        self.assertIs(namedlist('A', 'x, y', default=0), A)
+        self.assertIs(namedlist('A', iter(['x', 'y']), default=0), A)
+        self.assertIsNot(namedtuple('A', 'x y', default=0), A)
+        self.assertIsNot(namedlist('A', 'x y', default=0, use_slots=False), A)
+        self.assertIsNot(namedlist('B', 'x y', default=0), A)
+        self.assertEqual(A.__module__, __name__)
+        self.assertEqual(type_cache.info(), (2, 4, 2, 2))
+
+    def test_default_identity(self):
+        default = []
+        A = namedlist('A', [('x', default)])
+        self.assertIs(namedlist('A', [('x', default)]), A)
+        self.assertIsNot(namedlist('A', [('x', [])]), A)
+        self.assertIsNot(namedlist('A', 'x', default=default), A)
+
+    def test_lru(self):
+        A = namedlist('A', 'x')
+        B = namedlist('B', 'x')
+        self.assertIs(namedlist('A', 'x'), A)
+        C = namedlist('C', 'x')             # evicts B
+        self.assertIs(namedlist('A', 'x'), A)
+        self.assertIsNot(namedlist('B', 'x'), B)
+        self.assertEqual(type_cache.info().currsize, 2)
+
+    def test_disabled(self):
+        type_cache.resize(0)
+        self.assertIsNot(namedlist('A', 'x'), namedlist('A', 'x'))
+        self.assertEqual(type_cache.info(), (0, 2, 0, 0))
+        self.assertRaises(ValueError, type_cache.resize, -1)
+
+    def test_errors_not_cached(self):
+        self.assertRaises(ValueError, namedlist, 'A', [('x', 3, 4)])
+        namedlist('A', [('x', 3)])
+        self.assertRaises(ValueError, namedlist, 'A', [('x', 3, 4)])
+        self.assertRaises(ValueError, namedlist, 'A', [3])
+        self.assertRaises(ValueError, namedtuple, 'A', 'x x')
+
+    def test_make_types(self):
+        # Classes are cached only once make_types has compiled their
+        #  functions. Use a field count that no other test uses, so the
+        #  templates aren't compiled yet.
+        type_cache.resize(None)
+        fields = ['f{0}'.format(i) for i in range(37)]
+        self.assertRaises(ValueError, make_types,
+                          [(namedlist, 'A', fields), (namedlist, 'B', 'x x')])
+        self.assertEqual(type_cache.info().currsize, 0)
+        self.assertEqual(list(namedlist('A', fields)(*range(37))), list(range(37)))
+
+        type_cache.clear()
+        A, B, A2 = make_types([(namedlist, 'A', fields, {'default': 0}), (namedlist, 'B', 'x'),
+                               (namedlist, 'A', fields, {'default': 0})])
+        self.assertIs(A2, A)
+        self.assertIs(namedlist('A', fields, default=0), A)
+        self.assertEqual(list(A(f36=1)), [0] * 36 + [1])
+        self.assertEqual(type_cache.info().currsize, 2)
+
+
+class TestMakeTypes(unittest.TestCase):
+    def test_make_types(self):
+        # Use field counts that no other test uses, so the templates for
+        #  these classes are compiled by make_types.
+        wide = ['f{0}'.format(i) for i in range(61)]
+        Point, Pair, Row, Tick, Cols = make_types([
+            (namedlist, 'Point', 'x y'),
+            (namedtuple, 'Pair', wide, {'default': 0}),
+            (namedlist, 'Row', wide + ['g'], {'order': True, 'frozen': True}),
+            (namedlist, 'Tick', 'ts px', {'types': 'q d', 'storage': 'struct'}),
+            (namedlist_array, 'Cols', iter(['a', 'b']), {'types': 'i d'})])
+
+        self.assertEqual(Point(1, 2), Point._make((1, 2)))
+        self.assertEqual(Pair(f60=3)[60], 3)
+        self.assertEqual(Pair._make(range(61)), tuple(range(61)))
+        row = Row(*range(62))
+        self.assertEqual(Row._make_many([range(62)]), [row])
+        self.assertEqual(hash(row), hash(tuple(range(62))))
+        self.assertTrue(row < Row(*range(1, 63)))
+        self.assertRaises(AttributeError, setattr, row, 'g', 0)
+        self.assertEqual(Tick(1, 2.5).__getstate__(), struct.pack('<qd', 1, 2.5))
+        cols = Cols()
+        cols.append(1, 2.5)
+        self.assertEqual(list(cols[0]), [1, 2.5])
+        self.assertEqual(Row.__init__.__name__, '__init__')
+
+        for cls in (Point, Pair, Row, Tick, Cols):
+            self.assertEqual(cls.__module__, __name__)
+        self.assertEqual(make_types([(namedlist, 'A', 'x')], module='other')[0].__module__, 'other')
+        self.assertEqual(make_types([]), [])
+
+    def test_errors(self):
+        self.assertRaises(ValueError, make_types, [(namedlist, 'A')])
+        self.assertRaises(ValueError, make_types, [(collections.namedtuple, 'A', 'x')])
+        self.assertRaises(ValueError, make_types, [(namedlist, 'A', 'x'), (namedlist, 'B', 'x x')])
+        self.assertRaises(TypeError, make_types, [(namedlist, 'A', 'x', {'unknown': 1})])
+
+        # After an error, functions are compiled as usual again.
+        fields = ['f{0}'.format(i) for i in range(63)]
+        A = namedlist('A', fields, default=0)
+        self.assertEqual(A(f62=1)[62], 1)
+
+    def test_module(self):
+        self.assertEqual(namedlist('A', 'x', module='some.module').__module__, 'some.module')
+        self.assertEqual(namedtuple('A', 'x', module='some.module').__module__, 'some.module')
+        self.assertEqual(namedlist_array('A', 'x', module='some.module').__module__, 'some.module')
+
+
+class TestCodeCache(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.path = tempfile.mkdtemp()
+        set_code_cache(self.path)
+
+    def tearDown(self):
+        import shutil
+        set_code_cache(None)
+        shutil.rmtree(self.path)
+
+    def forget_templates(self, count):
+        import namedlist
+        for key in list(namedlist._templates):
+            if key[2] == count:
+                del namedlist._templates[key]
+
+    def test_cache(self):
+        import os
+        # Use a field count that no other test uses, so the templates
+        #  aren't compiled yet.
+        fields = ['f{0}'.format(i) for i in range(71)]
+        self.forget_templates(71)
+        A = namedlist('A', fields, default=0)
+        files = sorted(os.listdir(self.path))
+        self.assertTrue(files)
+        self.assertTrue(all(name.endswith('.marshal') for name in files))
+
+        # Later classes load the code from the cache.
+        self.forget_templates(71)
+        B = namedlist('B', fields, default=0)
+        self.assertEqual(sorted(os.listdir(self.path)), files)
+        b = B(f70=3)
+        self.assertEqual(b[70], 3)
+        self.assertEqual(B._make(range(71)), B(*range(71)))
+        self.assertEqual(list(A(f1=1)), list(B(f1=1)))
+
+    def test_bad_files_are_recompiled(self):
+        import os
+        fields = ['f{0}'.format(i) for i in range(72)]
+        self.forget_templates(72)
+        namedlist('A', fields, default=0)
+        for name in os.listdir(self.path):
+            with open(os.path.join(self.path, name), 'wb') as fp:
+                fp.write(b'not marshal data')
+
+        self.forget_templates(72)
+        A = namedlist('A', fields, default=0)
+        self.assertEqual(A(f71=2)[71], 2)
+
+    def test_disabled(self):
+        import os
+        set_code_cache(None)
+        self.forget_templates(73)
+        namedlist('A', ['f{0}'.format(i) for i in range(73)])
+        self.assertEqual(os.listdir(self.path), [])
+
+
+class TestImport(unittest.TestCase):
+    # The budget for the cumulative time to import namedlist, from
+    #  compiled bytecode, in microseconds as reported by -X importtime.
+    #  It's about 4ms on a typical machine; the budget leaves room for
+    #  slow test machines.
+    IMPORT_BUDGET_US = 25000
+
+    def run_python(self, code, env=None):
+        import os
+        import subprocess
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = 'import sys; sys.path.insert(0, {0!r}); {1}'.format(root, code)
+        process = subprocess.Popen([sys.executable, '-c', code], env=env,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+        self.assertEqual(process.returncode, 0, stderr)
+        return stdout.decode('utf-8'), stderr.decode('utf-8')
+
+    def test_lazy_imports(self):
+        stdout, _ = self.run_python('before = set(sys.modules); import namedlist; '
+                                    'print(" ".join(sorted(set(sys.modules) - before)))')
+        imported = set(stdout.split())
+        self.assertIn('namedlist', imported)
+        for name in ('ast', 'copy', 'struct', 'array', 'threading', 'types', 'json', 'mmap'):
+            self.assertNotIn(name, imported)
+
+        # They're imported when they're needed.
+        stdout, _ = self.run_python('import namedlist; namedlist.namedlist("A", "x"); '
+                                    'print("ast" in sys.modules)')
+        self.assertEqual(stdout.strip(), 'True')
+
+    @unittest.skipIf(sys.version_info < (3, 8), 'requires -X importtime and PYTHONPYCACHEPREFIX')
+    def test_import_time(self):
+        import os
+        import shutil
+        import tempfile
+        cache = tempfile.mkdtemp()
+        try:
+            env = dict(os.environ, PYTHONPYCACHEPREFIX=cache)
+            env.pop('PYTHONDONTWRITEBYTECODE', None)
+            # The first run writes the bytecode.
+            self.run_python('import namedlist', env)
+            times = []
+            for _ in range(3):
+                _, stderr = self.run_python('import namedlist', dict(env, PYTHONPROFILEIMPORTTIME='1'))
+                for line in stderr.splitlines():
+                    fields = [field.strip() for field in line.split('|')]
+                    if len(fields) == 3 and fields[2] == 'namedlist':
+                        times.append(int(fields[1]))
+        finally:
+            shutil.rmtree(cache)
+        self.assertEqual(len(times), 3)
+        self.assertLess(min(times), self.IMPORT_BUDGET_US)
+
+
 class TestAll(unittest.TestCase):
     def test_all(self):
         import namedlist